@@ -27,18 +27,23 @@ def create_flask_app_with_configs() -> RagApp:
 
 
 def initialize_extensions(app: RagApp):
-    from extensions import (ext_blueprints, ext_celery, ext_database,
-                            ext_logging, ext_login, ext_rbtrag, ext_redis,
-                            ext_storage, ext_timezone, ext_warnings)
+    from extensions import (ext_blueprints, ext_celery, ext_commands,
+                            ext_database, ext_logging, ext_login,
+                            ext_metrics, ext_query_stats, ext_rbtrag,
+                            ext_redis, ext_storage, ext_timezone,
+                            ext_warnings)
 
     extensions = [
         ext_timezone,
+        ext_metrics,
         ext_storage,
         ext_celery,
         ext_logging,
         ext_warnings,
         ext_blueprints,
+        ext_commands,
         ext_database,
+        ext_query_stats,
         ext_login,
         ext_redis,
         ext_rbtrag,
@@ -0,0 +1,249 @@
+"""
+Benchmark `Storage` operations across storage backends.
+
+Every operation runs against each backend for small and large objects at several concurrency levels, and
+throughput and latency percentiles are printed as one table per backend. The OpenDAL `fs` and `memory` schemes
+always run. An S3-compatible server (e.g. a local MinIO) is benchmarked through OpenDAL's `s3` scheme when
+`--s3-endpoint` is given.
+
+Results can be written with `--output` and compared against an earlier run with `--baseline`, the command
+exits with status 1 when the throughput of an operation dropped by more than `--tolerance`.
+
+Run from the project root, with the usual environment (e.g. BASE_DIR) set:
+
+    python -m benchmarks.storage_benchmark --iterations 50
+    python -m benchmarks.storage_benchmark --s3-endpoint http://127.0.0.1:9000 --s3-bucket bench \\
+        --s3-access-key-id minioadmin --s3-secret-access-key minioadmin
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import click
+
+from extensions.ext_storage import Storage
+from extensions.storage.opendal_storage import OpenDALStorage
+from extensions.storage.storage_metrics import StorageMetrics
+
+OPERATIONS = ["save", "load_once", "load_stream", "download", "exists", "delete"]
+
+
+@dataclass
+class BenchmarkResult:
+    backend: str
+    operation: str
+    object_size: int
+    concurrency: int
+    ops_per_second: float
+    mb_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.backend}/{self.operation}/{self.object_size}/{self.concurrency}"
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    index = min(int(len(sorted_values) * percentile), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _make_storage(backend: str, runner: OpenDALStorage) -> Storage:
+    storage = Storage()
+    storage.storage_runner = runner
+    storage.metrics = StorageMetrics(backend, enabled=False)
+    return storage
+
+
+def _make_backends(
+    s3_endpoint: Optional[str],
+    s3_bucket: str,
+    s3_region: str,
+    s3_access_key_id: Optional[str],
+    s3_secret_access_key: Optional[str],
+    fs_root: str,
+) -> dict[str, OpenDALStorage]:
+    backends = {
+        "memory": OpenDALStorage(scheme="memory", root="/"),
+        "fs": OpenDALStorage(scheme="fs", root=fs_root),
+    }
+    if s3_endpoint:
+        s3_kwargs = {"endpoint": s3_endpoint, "bucket": s3_bucket, "region": s3_region, "root": "/storage-benchmark"}
+        if s3_access_key_id and s3_secret_access_key:
+            s3_kwargs["access_key_id"] = s3_access_key_id
+            s3_kwargs["secret_access_key"] = s3_secret_access_key
+        backends["s3"] = OpenDALStorage(scheme="s3", **s3_kwargs)
+    return backends
+
+
+def _run_operation(
+    storage: Storage, operation: str, keys: list[str], data: bytes, concurrency: int, download_dir: str
+) -> tuple[float, list[float]]:
+    def call(key: str) -> float:
+        start_at = time.perf_counter()
+        match operation:
+            case "save":
+                storage.save(key, data)
+            case "load_once":
+                storage.load_once(key)
+            case "load_stream":
+                for _ in storage.load_stream(key):
+                    pass
+            case "download":
+                target_filepath = os.path.join(download_dir, key.replace("/", "_"))
+                storage.download(key, target_filepath)
+                os.unlink(target_filepath)
+            case "exists":
+                storage.exists(key)
+            case "delete":
+                storage.delete(key)
+        return time.perf_counter() - start_at
+
+    start_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(call, keys))
+    return time.perf_counter() - start_at, latencies
+
+
+def run_benchmark(
+    backend: str,
+    storage: Storage,
+    object_sizes: list[int],
+    concurrency_levels: list[int],
+    iterations: int,
+    download_dir: str,
+    echo: Callable[[str], None],
+) -> list[BenchmarkResult]:
+    results = []
+    for object_size in object_sizes:
+        data = os.urandom(object_size)
+        for concurrency in concurrency_levels:
+            prefix = f"bench-{uuid.uuid4().hex}"
+            keys = [f"{prefix}/{i}.bin" for i in range(iterations)]
+            # operations run in order, so loads find the saved objects and delete removes them
+            for operation in OPERATIONS:
+                elapsed, latencies = _run_operation(storage, operation, keys, data, concurrency, download_dir)
+                latencies.sort()
+                moves_data = operation in {"save", "load_once", "load_stream", "download"}
+                result = BenchmarkResult(
+                    backend=backend,
+                    operation=operation,
+                    object_size=object_size,
+                    concurrency=concurrency,
+                    ops_per_second=len(keys) / elapsed,
+                    mb_per_second=len(keys) * object_size / elapsed / 1024 / 1024 if moves_data else 0.0,
+                    p50_ms=statistics.median(latencies) * 1000,
+                    p95_ms=_percentile(latencies, 0.95) * 1000,
+                    p99_ms=_percentile(latencies, 0.99) * 1000,
+                )
+                results.append(result)
+                echo(f"  {result.name}: {result.ops_per_second:.1f} ops/s")
+    return results
+
+
+def format_table(results: list[BenchmarkResult]) -> str:
+    header = f"{'operation':<12} {'size':>10} {'conc':>5} {'ops/s':>10} {'MB/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.operation:<12} {result.object_size:>10} {result.concurrency:>5} "
+            f"{result.ops_per_second:>10.1f} {result.mb_per_second:>9.1f} "
+            f"{result.p50_ms:>9.2f} {result.p95_ms:>9.2f} {result.p99_ms:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def find_regressions(results: list[BenchmarkResult], baseline: list[dict], tolerance: float) -> list[str]:
+    baseline_by_name = {BenchmarkResult(**item).name: BenchmarkResult(**item) for item in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_name.get(result.name)
+        if previous and result.ops_per_second < previous.ops_per_second * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: {result.ops_per_second:.1f} ops/s, baseline {previous.ops_per_second:.1f} ops/s"
+            )
+    return regressions
+
+
+def _parse_int_list(ctx, param, value: str) -> list[int]:
+    try:
+        return [int(item) for item in value.split(",") if item]
+    except ValueError:
+        raise click.BadParameter("must be a comma separated list of integers")
+
+
+@click.command()
+@click.option("--object-sizes", default="4096,16777216", callback=_parse_int_list, help="Object sizes in bytes.")
+@click.option("--concurrency", default="1,8,32", callback=_parse_int_list, help="Numbers of concurrent requests.")
+@click.option("--iterations", default=32, type=click.IntRange(min=1), help="Objects per size and concurrency level.")
+@click.option("--chunk-size", type=int, default=None, help="Override the OpenDAL min and max stream chunk size.")
+@click.option("--s3-endpoint", default=None, help="Endpoint of an S3-compatible server, e.g. a local MinIO.")
+@click.option("--s3-bucket", default="storage-benchmark")
+@click.option("--s3-region", default="us-east-1")
+@click.option("--s3-access-key-id", default=None)
+@click.option("--s3-secret-access-key", default=None)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the results as JSON.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None, help="Results to compare to.")
+@click.option("--tolerance", default=0.2, type=click.FloatRange(min=0), help="Allowed relative throughput drop.")
+def storage_benchmark(
+    object_sizes: list[int],
+    concurrency: list[int],
+    iterations: int,
+    chunk_size: Optional[int],
+    s3_endpoint: Optional[str],
+    s3_bucket: str,
+    s3_region: str,
+    s3_access_key_id: Optional[str],
+    s3_secret_access_key: Optional[str],
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+):
+    results: list[BenchmarkResult] = []
+    with tempfile.TemporaryDirectory() as fs_root, tempfile.TemporaryDirectory() as download_dir:
+        backends = _make_backends(s3_endpoint, s3_bucket, s3_region, s3_access_key_id, s3_secret_access_key, fs_root)
+        for backend, runner in backends.items():
+            if chunk_size:
+                runner.min_chunk_size = runner.max_chunk_size = chunk_size
+            click.echo(click.style(f"Benchmarking {backend}", fg="green"))
+            backend_results = run_benchmark(
+                backend,
+                _make_storage(backend, runner),
+                object_sizes,
+                concurrency,
+                iterations,
+                download_dir,
+                click.echo,
+            )
+            click.echo(f"\n{backend} (chunk size {runner.min_chunk_size}-{runner.max_chunk_size})")
+            click.echo(format_table(backend_results) + "\n")
+            results.extend(backend_results)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = find_regressions(results, json.load(f), tolerance)
+        if regressions:
+            click.echo(click.style("Throughput regressions:", fg="red"))
+            for regression in regressions:
+                click.echo(click.style(f"  {regression}", fg="red"))
+            sys.exit(1)
+        click.echo(click.style("No throughput regressions.", fg="green"))
+
+
+if __name__ == "__main__":
+    storage_benchmark()
@@ -0,0 +1,24 @@
+import click
+
+from configs import rag_config
+from services.upload_file_partition_service import UploadFilePartitionService
+
+
+@click.command(
+    "convert-upload-files-to-partitions",
+    help="Convert upload_files to monthly partitions by created_at. Locks the table while rows are copied.",
+)
+@click.option("--force", is_flag=True, help="Skip the confirmation prompt.")
+def convert_upload_files_to_partitions(force: bool):
+    if UploadFilePartitionService.is_partitioned():
+        click.echo(click.style("upload_files is already partitioned.", fg="green"))
+        return
+
+    if not force:
+        click.confirm(
+            "upload_files will be locked against reads and writes while it is copied, continue?", abort=True
+        )
+
+    click.echo(click.style("Start convert upload_files to partitions.", fg="green"))
+    UploadFilePartitionService.convert_table(rag_config.UPLOAD_FILE_PARTITION_PREMAKE_MONTHS)
+    click.echo(click.style("upload_files is partitioned.", fg="green"))
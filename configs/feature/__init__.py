@@ -1,7 +1,7 @@
 from typing import Annotated, Optional
 
-from pydantic import (AliasChoices, Field, NonNegativeInt, PositiveFloat,
-                      PositiveInt, computed_field)
+from pydantic import (AliasChoices, Field, NonNegativeFloat, NonNegativeInt,
+                      PositiveFloat, PositiveInt, computed_field)
 from pydantic_settings import BaseSettings
 
 
@@ -79,6 +79,122 @@ class CeleryBeatConfig(BaseSettings):
         default=1,
     )
 
+    UNUSED_UPLOAD_FILE_RETENTION_DAYS: PositiveInt = Field(
+        description="Number of days an upload that was never used is kept before the cleanup task removes it",
+        default=7,
+    )
+
+    CLEAN_TASK_BATCH_SIZE: PositiveInt = Field(
+        description="Number of rows fetched and deleted per batch by cleanup tasks",
+        default=500,
+    )
+
+    CLEAN_TASK_STORAGE_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of concurrent storage deletions issued by cleanup tasks",
+        default=8,
+    )
+
+    CLEAN_TASK_BATCH_INTERVAL: NonNegativeFloat = Field(
+        description="Pause in seconds between two batches of a cleanup task, to keep load on the database"
+        " and storage low",
+        default=0.5,
+    )
+
+    ACCOUNT_ACTIVITY_FLUSH_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds at which last_active_at of accounts recorded in Redis is written"
+        " to the database",
+        default=60,
+    )
+
+    TENANT_STORAGE_USAGE_RECONCILE_INTERVAL: PositiveInt = Field(
+        description="Interval in minutes at which the per-tenant storage usage counters in Redis are reset to the"
+        " totals in the database",
+        default=60,
+    )
+
+    UPLOAD_FILE_PARTITIONING_ENABLED: bool = Field(
+        description="Maintain the monthly partitions of upload_files by created_at. The table is converted to the"
+        " partitioned layout once with the convert-upload-files-to-partitions command",
+        default=False,
+    )
+
+    UPLOAD_FILE_PARTITION_PREMAKE_MONTHS: PositiveInt = Field(
+        description="Number of months ahead of the current one for which upload_files partitions are created, at"
+        " least 1 so uploads keep working across a month boundary when a maintenance run is late",
+        default=3,
+    )
+
+    UPLOAD_FILE_PARTITION_RETENTION_MONTHS: NonNegativeInt = Field(
+        description="Number of months before the current one whose upload_files partitions are kept, older ones"
+        " are detached, their files deleted and the partitions dropped. 0 keeps every partition",
+        default=0,
+    )
+
+
+class EmbeddingCacheConfig(BaseSettings):
+    """
+    Configuration for the embedding cache
+    """
+
+    EMBEDDING_CACHE_ENABLED: bool = Field(
+        description="Enable caching of chunk and query embeddings in Redis",
+        default=True,
+    )
+
+    EMBEDDING_CACHE_MAX_AGE_DAYS: PositiveInt = Field(
+        description="Number of days an unused embedding is kept before the cleanup task evicts it",
+        default=30,
+    )
+
+    EMBEDDING_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum size of the embedding cache in megabytes (MB),"
+        " least recently used entries are evicted beyond it",
+        default=1024,
+    )
+
+
+class MetricsConfig(BaseSettings):
+    """
+    Configuration for Prometheus metrics
+    """
+
+    METRICS_ENABLED: bool = Field(
+        description="Enable collection of Prometheus metrics and the metrics endpoint, requires prometheus_client",
+        default=False,
+    )
+
+    METRICS_PATH: str = Field(
+        description="URL path of the Prometheus metrics endpoint",
+        default="/metrics",
+    )
+
+
+class QueryStatsConfig(BaseSettings):
+    """
+    Configuration for per-request database query accounting
+    """
+
+    QUERY_STATS_ENABLED: bool = Field(
+        description="Count the database queries and time of every request and log them with the request id",
+        default=False,
+    )
+
+    QUERY_STATS_MAX_QUERIES: PositiveInt = Field(
+        description="Number of queries above which a request is logged as a warning",
+        default=50,
+    )
+
+    QUERY_STATS_REPEATED_THRESHOLD: PositiveInt = Field(
+        description="Number of runs of the same statement within a request above which it is logged as a likely"
+        " N+1 query",
+        default=10,
+    )
+
+    SLOW_QUERY_THRESHOLD_MS: NonNegativeFloat = Field(
+        description="Duration in milliseconds above which a query is logged with its parameters, 0 disables it",
+        default=500,
+    )
+
 
 class RagEtlConfig(BaseSettings):
     """
@@ -262,6 +378,29 @@ class FileUploadConfig(BaseSettings):
         default=10,
     )
 
+    TENANT_STORAGE_QUOTA_MB: NonNegativeInt = Field(
+        description="Maximum total size in megabytes of the upload files of a tenant, 0 for no limit",
+        default=0,
+    )
+
+
+class ImageVariantConfig(BaseSettings):
+    """
+    Configuration for resized image previews
+    """
+
+    IMAGE_VARIANT_ENABLED: bool = Field(
+        description="Serve resized variants of image previews when a width is requested,"
+        " generated once and cached in storage",
+        default=True,
+    )
+
+    IMAGE_VARIANT_QUALITY: PositiveInt = Field(
+        description="Encoding quality (1-100) of resized image variants",
+        default=80,
+        le=100,
+    )
+
 
 class AuthConfig(BaseSettings):
     """
@@ -314,6 +453,29 @@ class AuthConfig(BaseSettings):
     )
 
 
+class AccountCacheConfig(BaseSettings):
+    """
+    Configuration for the cache of authenticated accounts
+    """
+
+    ACCOUNT_CACHE_ENABLED: bool = Field(
+        description="Cache the account and current tenant resolved for a request, in Redis and in process",
+        default=True,
+    )
+
+    ACCOUNT_CACHE_TTL: PositiveInt = Field(
+        description="Time in seconds a cached account or tenant is kept in Redis,"
+        " changes made through the ORM invalidate it earlier",
+        default=300,
+    )
+
+    ACCOUNT_CACHE_LOCAL_TTL: NonNegativeFloat = Field(
+        description="Time in seconds a cached account or tenant is kept in process memory, it is not invalidated"
+        " in other workers, so this bounds how long a ban or role change takes to apply everywhere. 0 disables it",
+        default=5,
+    )
+
+
 class SecurityConfig(BaseSettings):
     """
     Security-related configurations for the application
@@ -352,10 +514,15 @@ class HostedServiceConfig(
     EndpointConfig,
     LoggingConfig,
     CeleryBeatConfig,
+    EmbeddingCacheConfig,
+    MetricsConfig,
+    QueryStatsConfig,
     RagEtlConfig,
     HttpConfig,
     FileUploadConfig,
+    ImageVariantConfig,
     AuthConfig,
+    AccountCacheConfig,
     SecurityConfig,
 ):
     pass
@@ -9,6 +9,8 @@ from .cache import RedisConfig
 from .storage import OpenDALStorageConfig
 from .vdb import MilvusConfig
 
+REPLICA_BIND_KEY_PREFIX = "replica_"
+
 
 class StorageConfig(BaseSettings):
     STORAGE_TYPE: Literal[
@@ -37,7 +39,56 @@ class StorageConfig(BaseSettings):
         deprecated=True,
     )
 
+    STORAGE_SPOOL_MAX_SIZE: PositiveInt = Field(
+        description="Maximum size in bytes of a remote object buffered in memory when opened as a file,"
+                    " larger objects spill to a temporary file. Default is 8MB.",
+        default=8 * 1024 * 1024,
+    )
+
+    STORAGE_BATCH_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of concurrent requests issued by a batch storage operation.",
+        default=16,
+    )
 
+    STORAGE_CACHE_ENABLED: bool = Field(
+        description="Enable a read-through cache on local disk in front of remote storage backends.",
+        default=False,
+    )
+
+    STORAGE_CACHE_PATH: str = Field(
+        description="Directory of the local storage cache, can be shared by all workers of a host.",
+        default="storage_cache",
+    )
+
+    STORAGE_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum size of the local storage cache in megabytes (MB),"
+                    " least recently used objects are evicted beyond it.",
+        default=1024,
+    )
+
+    STORAGE_CACHE_MAX_OBJECT_SIZE: PositiveInt = Field(
+        description="Objects larger than this size in megabytes (MB) are not cached.",
+        default=64,
+    )
+
+    STORAGE_COMPRESSION_ENABLED: bool = Field(
+        description="Store text-like uploads (text, Markdown, CSV, HTML, JSON, ...) compressed with zstd, or zlib when"
+                    " zstandard is not installed. Their keys carry the codec, so they are decompressed on read"
+                    " whether or not this is still enabled.",
+        default=False,
+    )
+
+    STORAGE_COMPRESSION_MIN_SIZE: NonNegativeInt = Field(
+        description="Objects smaller than this size in bytes are stored uncompressed.",
+        default=1024,
+    )
+
+    STORAGE_CONTENT_ADDRESSED_ENABLED: bool = Field(
+        description="Store uploads under the hash of their content (blobs/{sha3[:2]}/{sha3}.{extension}), so"
+                    " identical uploads share one object that is deleted with its last reference. Applies to new"
+                    " uploads only.",
+        default=False,
+    )
 
 
 class KeywordStoreConfig(BaseSettings):
@@ -141,6 +192,26 @@ class DatabaseConfig(BaseSettings):
             "connect_args": {"options": "-c timezone=UTC"},
         }
 
+    SQLALCHEMY_REPLICA_URIS: str = Field(
+        description="Comma-separated SQLAlchemy URIs of read replicas of the database. Read-only queries are"
+        " spread over them, everything else goes to the primary. Empty to send all queries to the primary.",
+        default="",
+    )
+
+    SQLALCHEMY_REPLICA_STICKY_SECONDS: NonNegativeInt = Field(
+        description="Seconds after a request committed writes during which the same client keeps reading from the"
+        " primary, so it sees its writes before the replicas catch up. 0 disables it.",
+        default=5,
+    )
+
+    @computed_field
+    def SQLALCHEMY_BINDS(self) -> dict[str, dict[str, Any]]:
+        replica_uris = [uri.strip() for uri in self.SQLALCHEMY_REPLICA_URIS.split(",") if uri.strip()]
+        return {
+            f"{REPLICA_BIND_KEY_PREFIX}{i}": {"url": uri, **self.SQLALCHEMY_ENGINE_OPTIONS}
+            for i, uri in enumerate(replica_uris)
+        }
+
 
 class CeleryConfig(DatabaseConfig):
     CELERY_BACKEND: str = Field(
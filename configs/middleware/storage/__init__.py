@@ -1,4 +1,4 @@
-from pydantic import Field
+from pydantic import Field, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -7,3 +7,14 @@ class OpenDALStorageConfig(BaseSettings):
         default="fs",
         description="OpenDAL scheme.",
     )
+
+    OPENDAL_STREAM_MIN_CHUNK_SIZE: PositiveInt = Field(
+        default=256 * 1024,
+        description="Size in bytes of the first read when streaming an object, later reads double up to the maximum.",
+    )
+
+    OPENDAL_STREAM_MAX_CHUNK_SIZE: PositiveInt = Field(
+        default=4 * 1024 * 1024,
+        description="Maximum size in bytes of a single read when streaming an object,"
+        " local schemes are capped at 1MB.",
+    )
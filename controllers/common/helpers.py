@@ -0,0 +1,101 @@
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Response, request
+from werkzeug.datastructures import ContentRange
+
+from models.model import UploadFile
+from services.file_service import FileService
+from services.image_variant_service import VARIANT_FORMATS, ImageVariantService
+
+FILE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _is_not_modified(upload_file: UploadFile) -> bool:
+    if upload_file.hash:
+        return request.if_none_match.contains(upload_file.hash)
+
+    if_modified_since = request.if_modified_since
+    if if_modified_since and not request.if_none_match:
+        return upload_file.created_at.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+
+    return False
+
+
+def _is_range_applicable(upload_file: UploadFile) -> bool:
+    # If-Range with a stale validator asks for the full content
+    if_range = request.if_range
+    if if_range.etag:
+        return upload_file.hash == if_range.etag
+    if if_range.date:
+        return upload_file.created_at.replace(microsecond=0) <= if_range.date.replace(tzinfo=None)
+    return True
+
+
+def make_image_variant_response(upload_file: UploadFile, width: int, image_format: str) -> Optional[Response]:
+    """
+    Build a response for a resized variant of an image, revalidated by an ETag derived from the original's.
+
+    A matching If-None-Match is answered with 304 before the variant is read or generated. Return None when the
+    image cannot be resized and the original should be served.
+    """
+    width = ImageVariantService.get_variant_width(width)
+    etag = f"{upload_file.hash or upload_file.id}-{width}.{image_format}"
+    response = Response(status=200, mimetype=VARIANT_FORMATS[image_format])
+    response.headers["Cache-Control"] = FILE_CACHE_CONTROL
+    response.set_etag(etag)
+    response.last_modified = upload_file.created_at
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+
+    variant = ImageVariantService.get_variant(upload_file, width, image_format)
+    if variant is None:
+        return None
+    data, _ = variant
+    response.set_data(data)
+    return response.make_conditional(request)
+
+
+def make_upload_file_response(upload_file: UploadFile, *, as_attachment: bool = False) -> Response:
+    """
+    Build a streaming response for an upload file that honours conditional and range requests.
+
+    A matching If-None-Match (or If-Modified-Since when the file has no hash) is answered with 304 without
+    touching storage, and a single byte range is served with 206 through a ranged storage read.
+    """
+    response = Response(status=200, mimetype=upload_file.mime_type or "application/octet-stream")
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Cache-Control"] = FILE_CACHE_CONTROL
+    if upload_file.hash:
+        response.set_etag(upload_file.hash)
+    response.last_modified = upload_file.created_at
+    if as_attachment:
+        response.headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(upload_file.name)}"
+
+    if _is_not_modified(upload_file):
+        response.status_code = 304
+        return response
+
+    size = upload_file.size
+    byte_range = request.range
+    # multipart ranges are rarely used by clients, fall back to the full content for them
+    if byte_range and len(byte_range.ranges) == 1 and _is_range_applicable(upload_file):
+        resolved = byte_range.range_for_length(size)
+        if resolved is None:
+            response.status_code = 416
+            response.content_range = ContentRange("bytes", None, None, size)
+            return response
+
+        start, end = resolved
+        response.status_code = 206
+        response.content_range = ContentRange("bytes", start, end, size)
+        response.content_length = end - start
+        response.response = FileService.load_upload_file_stream(upload_file, (start, end))
+        response.direct_passthrough = True
+        return response
+
+    response.content_length = size
+    response.response = FileService.load_upload_file_stream(upload_file)
+    response.direct_passthrough = True
+    return response
@@ -3,14 +3,17 @@ from flask import Blueprint
 from libs.external_api import ExternalApi
 
 
-from .files import FileApi
+from .files import FileApi, FileListApi, FilePreviewApi, ImagePreviewApi
 from .robert_rag import RbtRAGApi
 
 bp = Blueprint("console", __name__, url_prefix="/api")
 api = ExternalApi(bp)
 
 # File
+api.add_resource(FileListApi, "/files")
 api.add_resource(FileApi, "/files/upload")
+api.add_resource(FilePreviewApi, "/files/<uuid:file_id>/file-preview")
+api.add_resource(ImagePreviewApi, "/files/<uuid:file_id>/image-preview")
 
 # RbtRAG
 api.add_resource(RbtRAGApi, "/rbt_rag/query")
@@ -82,6 +82,12 @@ class TooManyFilesError(BaseHTTPException):
     code = 400
 
 
+class InvalidCursorError(BaseHTTPException):
+    error_code = "invalid_cursor"
+    description = "The pagination cursor is invalid."
+    code = 400
+
+
 class NoFileUploadedError(BaseHTTPException):
     error_code = "no_file_uploaded"
     description = "Please upload your file."
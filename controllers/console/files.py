@@ -3,24 +3,27 @@ from typing import Literal
 
 from flask import request
 from flask_login import current_user  # type: ignore
-from flask_restful import Resource, marshal_with  # type: ignore
+from flask_restful import Resource, inputs, marshal_with, reqparse  # type: ignore
 from werkzeug.exceptions import Forbidden
 
 import services
 from configs import rag_config
 from constants import DOCUMENT_EXTENSIONS
 from controllers.common.errors import FilenameNotExistsError
+from controllers.common.helpers import make_image_variant_response, make_upload_file_response
 from controllers.console.wraps import (
     account_initialization_required,
     # cloud_edition_billing_resource_check,
     setup_required,
 )
-from fields.file_fields import file_fields, upload_config_fields
+from fields.file_fields import file_fields, file_pagination_fields, upload_config_fields
 from libs.login import login_required
 from services.file_service import FileService
+from services.image_variant_service import DEFAULT_VARIANT_FORMAT, VARIANT_FORMATS, ImageVariantService
 
 from .error import (
     FileTooLargeError,
+    InvalidCursorError,
     NoFileUploadedError,
     TooManyFilesError,
     UnsupportedFileTypeError,
@@ -84,3 +87,79 @@ class FileApi(Resource):
 
         return save_file, 201
 
+
+class FileListApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    @marshal_with(file_pagination_fields)
+    def get(self):
+        parser = reqparse.RequestParser()
+        parser.add_argument("limit", type=inputs.int_range(1, 100), required=False, default=20, location="args")
+        parser.add_argument("cursor", type=str, required=False, location="args")
+        parser.add_argument("extension", type=str, required=False, location="args")
+        parser.add_argument("used", type=inputs.boolean, required=False, location="args")
+        args = parser.parse_args()
+
+        try:
+            upload_files, next_cursor = FileService.get_upload_files(
+                current_user.current_tenant_id,
+                limit=args["limit"],
+                cursor=args["cursor"],
+                extension=args["extension"],
+                used=args["used"],
+            )
+        except services.errors.file.InvalidCursorError:
+            raise InvalidCursorError()
+
+        return {
+            "limit": args["limit"],
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor,
+            "data": upload_files,
+        }
+
+
+class FilePreviewApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, file_id):
+        file_id = str(file_id)
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("as_attachment", type=inputs.boolean, required=False, default=False, location="args")
+        args = parser.parse_args()
+
+        upload_file = FileService.get_upload_file(file_id, tenant_id=current_user.current_tenant_id)
+
+        return make_upload_file_response(upload_file, as_attachment=args["as_attachment"])
+
+
+class ImagePreviewApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, file_id):
+        file_id = str(file_id)
+
+        parser = reqparse.RequestParser()
+        parser.add_argument("width", type=inputs.int_range(1, 4096), required=False, location="args")
+        parser.add_argument(
+            "format", type=str, choices=list(VARIANT_FORMATS), default=DEFAULT_VARIANT_FORMAT, location="args"
+        )
+        args = parser.parse_args()
+
+        try:
+            upload_file = FileService.get_upload_file(
+                file_id, tenant_id=current_user.current_tenant_id, image_only=True
+            )
+        except services.errors.file.UnsupportedFileTypeError:
+            raise UnsupportedFileTypeError()
+
+        if args["width"] and ImageVariantService.is_resizable(upload_file):
+            response = make_image_variant_response(upload_file, args["width"], args["format"])
+            if response:
+                return response
+
+        return make_upload_file_response(upload_file)
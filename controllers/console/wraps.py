@@ -8,10 +8,8 @@ from flask_login import current_user  # type: ignore
 
 from configs import rag_config
 from controllers.console.workspace.error import AccountNotInitializedError
-from extensions.ext_database import db
-
-from models.model import RagSetup
 # from services.feature_service import FeatureService
+from services.setup_service import SetupService
 
 from .error import NotInitValidateError, NotSetupError, UnauthorizedAndForceLogout
 
@@ -76,13 +74,9 @@ def setup_required(view):
     @wraps(view)
     def decorated(*args, **kwargs):
         # check setup
-        if (
-            rag_config.EDITION == "SELF_HOSTED"
-            and os.environ.get("INIT_PASSWORD")
-            and not db.session.query(RagSetup).first()
-        ):
-            raise NotInitValidateError()
-        elif rag_config.EDITION == "SELF_HOSTED" and not db.session.query(RagSetup).first():
+        if rag_config.EDITION == "SELF_HOSTED" and not SetupService.is_setup_finished():
+            if os.environ.get("INIT_PASSWORD"):
+                raise NotInitValidateError()
             raise NotSetupError()
 
         return view(*args, **kwargs)
@@ -103,6 +103,12 @@ class FileTooLargeError(BaseHTTPException):
     code = 413
 
 
+class StorageQuotaExceededError(BaseHTTPException):
+    error_code = "storage_quota_exceeded"
+    description = "Storage quota exceeded. {message}"
+    code = 403
+
+
 class UnsupportedFileTypeError(BaseHTTPException):
     error_code = "unsupported_file_type"
     description = "File type not allowed."
@@ -7,6 +7,7 @@ from controllers.service_api import api
 from controllers.service_api.app.error import (
     FileTooLargeError,
     NoFileUploadedError,
+    StorageQuotaExceededError,
     TooManyFilesError,
     UnsupportedFileTypeError,
 )
@@ -50,6 +51,8 @@ class FileApi(Resource):
             raise FileTooLargeError(file_too_large_error.description)
         except services.errors.file.UnsupportedFileTypeError:
             raise UnsupportedFileTypeError()
+        except services.errors.file.StorageQuotaExceededError as storage_quota_exceeded_error:
+            raise StorageQuotaExceededError(storage_quota_exceeded_error.description)
 
         return upload_file, 201
 
@@ -0,0 +1,119 @@
+import logging
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from pymilvus import DataType, MilvusClient  # type: ignore
+
+from configs import rag_config
+from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.models.document import Document
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class Field:
+    PRIMARY_KEY = "id"
+    CONTENT_KEY = "page_content"
+    METADATA_KEY = "metadata"
+    VECTOR = "vector"
+
+
+class MilvusConfig(BaseModel):
+    """
+    Configuration class for Milvus connection.
+    """
+
+    uri: str
+    user: Optional[str] = None
+    password: Optional[str] = None
+    database: str = "default"
+    batch_size: int = 100
+
+    def to_milvus_params(self):
+        return {
+            "uri": self.uri,
+            "user": self.user,
+            "password": self.password,
+            "db_name": self.database,
+        }
+
+
+class MilvusVector(BaseVector):
+    """
+    Milvus vector storage whose primary keys are the segment `doc_id`s, so chunks can be upserted and
+    deleted individually when a document is re-indexed.
+    """
+
+    def __init__(self, collection_name: str, config: Optional[MilvusConfig] = None):
+        super().__init__(collection_name)
+        self._client_config = config or MilvusConfig(
+            uri=f"http://{rag_config.MILVUS_HOST}:{rag_config.MILVUS_PORT}",
+            user=rag_config.MILVUS_USER,
+            password=rag_config.MILVUS_PASSWORD,
+            database=rag_config.MILVUS_DATABASE,
+        )
+        self._client = self._init_client(self._client_config)
+
+    def get_type(self) -> str:
+        return "milvus"
+
+    def add_texts(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
+        if not documents:
+            return
+
+        self._create_collection_if_not_exists(len(embeddings[0]))
+
+        insert_dict_list: list[dict[str, Any]] = []
+        for document, embedding in zip(documents, embeddings):
+            insert_dict_list.append(
+                {
+                    Field.PRIMARY_KEY: document.metadata["doc_id"],
+                    Field.CONTENT_KEY: document.page_content,
+                    Field.VECTOR: embedding,
+                    Field.METADATA_KEY: document.metadata,
+                }
+            )
+
+        batch_size = self._client_config.batch_size
+        for i in range(0, len(insert_dict_list), batch_size):
+            batch = insert_dict_list[i : i + batch_size]
+            try:
+                self._client.upsert(collection_name=self._collection_name, data=batch)
+            except Exception:
+                logger.exception(f"Failed to upsert batch starting at entity: {i}/{len(insert_dict_list)}")
+                raise
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        if not ids or not self._client.has_collection(self._collection_name):
+            return
+
+        batch_size = self._client_config.batch_size
+        for i in range(0, len(ids), batch_size):
+            self._client.delete(collection_name=self._collection_name, ids=ids[i : i + batch_size])
+
+    def _create_collection_if_not_exists(self, dim: int):
+        lock_name = f"vector_indexing_lock_{self._collection_name}"
+        with redis_client.lock(lock_name, timeout=20):
+            collection_exist_cache_key = f"vector_indexing_{self._collection_name}"
+            if redis_client.get(collection_exist_cache_key):
+                return
+
+            if not self._client.has_collection(self._collection_name):
+                schema = MilvusClient.create_schema(auto_id=False, enable_dynamic_field=False)
+                schema.add_field(Field.PRIMARY_KEY, DataType.VARCHAR, max_length=64, is_primary=True)
+                schema.add_field(Field.VECTOR, DataType.FLOAT_VECTOR, dim=dim)
+                schema.add_field(Field.CONTENT_KEY, DataType.VARCHAR, max_length=65_535)
+                schema.add_field(Field.METADATA_KEY, DataType.JSON)
+
+                index_params = self._client.prepare_index_params()
+                index_params.add_index(field_name=Field.VECTOR, index_type="AUTOINDEX", metric_type="IP")
+
+                self._client.create_collection(
+                    collection_name=self._collection_name, schema=schema, index_params=index_params
+                )
+            redis_client.set(collection_exist_cache_key, 1, ex=3600)
+
+    @staticmethod
+    def _init_client(config: MilvusConfig) -> MilvusClient:
+        return MilvusClient(**config.to_milvus_params())
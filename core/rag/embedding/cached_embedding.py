@@ -0,0 +1,199 @@
+import logging
+import struct
+import time
+from typing import Optional, cast
+
+from configs import rag_config
+from core.rag.embedding.embedding_base import Embeddings
+from extensions.ext_redis import redis_client
+from libs.helper import generate_text_hash
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Redis-backed store of embeddings keyed by (model name, text hash).
+
+    Vectors are stored as little-endian float16, a quarter of the size of JSON-encoded float32 lists.
+    Every read and write refreshes the entry's score in a sorted set, which `evict` uses to drop entries
+    that are too old and then the least recently used ones until the cache fits its byte budget.
+    """
+
+    KEY_PREFIX = "embedding_cache"
+    LRU_KEY = f"{KEY_PREFIX}:lru"
+    SIZES_KEY = f"{KEY_PREFIX}:sizes"
+    TOTAL_BYTES_KEY = f"{KEY_PREFIX}:bytes"
+
+    @classmethod
+    def get_key(cls, model_name: str, text: str, *, is_query: bool = False) -> str:
+        # some models embed queries differently from documents, keep them apart
+        kind = "query" if is_query else "document"
+        return f"{cls.KEY_PREFIX}:{model_name}:{kind}:{generate_text_hash(text)}"
+
+    @staticmethod
+    def encode(vector: list[float]) -> bytes:
+        return struct.pack(f"<{len(vector)}e", *vector)
+
+    @staticmethod
+    def decode(data: bytes) -> list[float]:
+        return list(struct.unpack(f"<{len(data) // 2}e", data))
+
+    @classmethod
+    def get_many(cls, keys: list[str]) -> list[Optional[list[float]]]:
+        values = redis_client.mget(keys)
+
+        hit_keys = [key for key, value in zip(keys, values) if value is not None]
+        if hit_keys:
+            now = time.time()
+            redis_client.zadd(cls.LRU_KEY, dict.fromkeys(hit_keys, now))
+
+        return [cls.decode(value) if value is not None else None for value in values]
+
+    @classmethod
+    def set_many(cls, items: dict[str, list[float]]):
+        encoded: dict[str, bytes] = {}
+        for key, vector in items.items():
+            try:
+                encoded[key] = cls.encode(vector)
+            except OverflowError:
+                # value out of float16 range, do not cache a lossy copy
+                continue
+        if not encoded:
+            return
+
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in encoded.items():
+            pipe.set(key, value, nx=True)
+        created = pipe.execute()
+
+        now = time.time()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zadd(cls.LRU_KEY, dict.fromkeys(encoded, now))
+        new_bytes = 0
+        for (key, value), is_new in zip(encoded.items(), created):
+            if is_new:
+                pipe.hset(cls.SIZES_KEY, key, len(value))
+                new_bytes += len(value)
+        if new_bytes:
+            pipe.incrby(cls.TOTAL_BYTES_KEY, new_bytes)
+        pipe.execute()
+
+    @classmethod
+    def delete_many(cls, keys: list[str]) -> int:
+        """Remove the given entries and return the number of bytes released."""
+        if not keys:
+            return 0
+
+        sizes = redis_client.hmget(cls.SIZES_KEY, keys)
+        released_bytes = sum(int(size) for size in sizes if size is not None)
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.hdel(cls.SIZES_KEY, *keys)
+        pipe.zrem(cls.LRU_KEY, *keys)
+        if released_bytes:
+            pipe.decrby(cls.TOTAL_BYTES_KEY, released_bytes)
+        pipe.execute()
+        return released_bytes
+
+    @classmethod
+    def total_bytes(cls) -> int:
+        return int(redis_client.get(cls.TOTAL_BYTES_KEY) or 0)
+
+    @classmethod
+    def evict(cls, *, max_age_seconds: int, max_bytes: int, batch_size: int = 1000) -> tuple[int, int]:
+        """
+        Remove entries not used within `max_age_seconds`, then the least recently used entries until the
+        cache holds at most `max_bytes`. Return the number of entries and bytes removed.
+        """
+        removed_count = 0
+        removed_bytes = 0
+
+        expired_before = time.time() - max_age_seconds
+        while True:
+            keys = redis_client.zrangebyscore(cls.LRU_KEY, "-inf", expired_before, start=0, num=batch_size)
+            if not keys:
+                break
+            keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+            removed_bytes += cls.delete_many(keys)
+            removed_count += len(keys)
+
+        while cls.total_bytes() > max_bytes:
+            keys = redis_client.zrange(cls.LRU_KEY, 0, batch_size - 1)
+            if not keys:
+                # accounting drifted from the entries, nothing is left to evict
+                redis_client.set(cls.TOTAL_BYTES_KEY, 0)
+                break
+            keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+            removed_bytes += cls.delete_many(keys)
+            removed_count += len(keys)
+
+        return removed_count, removed_bytes
+
+
+class CacheEmbedding(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from `EmbeddingCache`.
+    Use it for both document chunks and queries so the same text is never embedded twice per model.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str) -> None:
+        self._embeddings = embeddings
+        self._model_name = model_name
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not rag_config.EMBEDDING_CACHE_ENABLED:
+            return self._embeddings.embed_documents(texts)
+
+        keys = [EmbeddingCache.get_key(self._model_name, text) for text in texts]
+        try:
+            cached = EmbeddingCache.get_many(keys)
+        except Exception:
+            logger.exception("Failed to read embedding cache")
+            cached = [None] * len(texts)
+
+        embeddings: list[Optional[list[float]]] = list(cached)
+        # dedupe misses, a batch often repeats boilerplate chunks
+        missing: dict[str, list[int]] = {}
+        for i, vector in enumerate(cached):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+
+        if missing:
+            missing_texts = list(missing)
+            vectors = self._embeddings.embed_documents(missing_texts)
+            for text, vector in zip(missing_texts, vectors):
+                for i in missing[text]:
+                    embeddings[i] = vector
+
+            try:
+                EmbeddingCache.set_many(
+                    {
+                        EmbeddingCache.get_key(self._model_name, text): vector
+                        for text, vector in zip(missing_texts, vectors)
+                    }
+                )
+            except Exception:
+                logger.exception("Failed to write embedding cache")
+
+        return cast(list[list[float]], embeddings)
+
+    def embed_query(self, text: str) -> list[float]:
+        if not rag_config.EMBEDDING_CACHE_ENABLED:
+            return self._embeddings.embed_query(text)
+
+        key = EmbeddingCache.get_key(self._model_name, text, is_query=True)
+        try:
+            cached = EmbeddingCache.get_many([key])[0]
+            if cached is not None:
+                return cached
+        except Exception:
+            logger.exception("Failed to read embedding cache")
+
+        vector = self._embeddings.embed_query(text)
+        try:
+            EmbeddingCache.set_many({key: vector})
+        except Exception:
+            logger.exception("Failed to write embedding cache")
+        return vector
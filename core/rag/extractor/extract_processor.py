@@ -1,5 +1,6 @@
 # import re
 # import tempfile
+# from contextlib import ExitStack
 # from pathlib import Path
 # from typing import Optional, Union
 # from urllib.parse import unquote
@@ -91,14 +92,12 @@
 #         cls, extract_setting: ExtractSetting, is_automatic: bool = False, file_path: Optional[str] = None
 #     ) -> list[Document]:
 #         if extract_setting.datasource_type == DatasourceType.FILE.value:
-#             with tempfile.TemporaryDirectory() as temp_dir:
+#             with ExitStack() as stack:
 #                 if not file_path:
 #                     assert extract_setting.upload_file is not None, "upload_file is required"
 #                     upload_file: UploadFile = extract_setting.upload_file
-#                     suffix = Path(upload_file.key).suffix
-#                     # FIXME mypy: Cannot determine type of 'tempfile._get_candidate_names' better not use it here
-#                     file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"  # type: ignore
-#                     storage.download(upload_file.key, file_path)
+#                     # parse in place when the object is on local disk, only remote objects are downloaded
+#                     file_path = stack.enter_context(storage.local_file(upload_file.key))
 #                 input_file = Path(file_path)
 #                 file_extension = input_file.suffix.lower()
 #                 etl_type = dify_config.ETL_TYPE
@@ -2,7 +2,6 @@ from datetime import timedelta
 
 import pytz
 from celery import Celery, Task  # type: ignore
-from celery.schedules import crontab  # type: ignore
 
 from configs import rag_config
 from rag_app import RagApp
@@ -65,11 +64,10 @@ def init_app(app: RagApp) -> Celery:
 
     imports = [
         "schedule.clean_embedding_cache_task",
-        "schedule.clean_unused_datasets_task",
-        "schedule.create_tidb_serverless_task",
-        "schedule.update_tidb_serverless_status_task",
-        "schedule.clean_messages",
-        "schedule.mail_clean_document_notify_task",
+        "schedule.clean_unused_upload_files_task",
+        "schedule.update_account_last_active_task",
+        "schedule.reconcile_tenant_storage_usage_task",
+        "schedule.maintain_upload_file_partitions_task",
     ]
     day = rag_config.CELERY_BEAT_SCHEDULER_TIME
     beat_schedule = {
@@ -77,27 +75,22 @@ def init_app(app: RagApp) -> Celery:
             "task": "schedule.clean_embedding_cache_task.clean_embedding_cache_task",
             "schedule": timedelta(days=day),
         },
-        "clean_unused_datasets_task": {
-            "task": "schedule.clean_unused_datasets_task.clean_unused_datasets_task",
+        "clean_unused_upload_files_task": {
+            "task": "schedule.clean_unused_upload_files_task.clean_unused_upload_files_task",
             "schedule": timedelta(days=day),
         },
-        "create_tidb_serverless_task": {
-            "task": "schedule.create_tidb_serverless_task.create_tidb_serverless_task",
-            "schedule": crontab(minute="0", hour="*"),
+        "update_account_last_active_task": {
+            "task": "schedule.update_account_last_active_task.update_account_last_active_task",
+            "schedule": timedelta(seconds=rag_config.ACCOUNT_ACTIVITY_FLUSH_INTERVAL),
         },
-        "update_tidb_serverless_status_task": {
-            "task": "schedule.update_tidb_serverless_status_task.update_tidb_serverless_status_task",
-            "schedule": timedelta(minutes=10),
+        "reconcile_tenant_storage_usage_task": {
+            "task": "schedule.reconcile_tenant_storage_usage_task.reconcile_tenant_storage_usage_task",
+            "schedule": timedelta(minutes=rag_config.TENANT_STORAGE_USAGE_RECONCILE_INTERVAL),
         },
-        "clean_messages": {
-            "task": "schedule.clean_messages.clean_messages",
+        "maintain_upload_file_partitions_task": {
+            "task": "schedule.maintain_upload_file_partitions_task.maintain_upload_file_partitions_task",
             "schedule": timedelta(days=day),
         },
-        # every Monday
-        "mail_clean_document_notify_task": {
-            "task": "schedule.mail_clean_document_notify_task.mail_clean_document_notify_task",
-            "schedule": crontab(minute="0", hour="10", day_of_week="1"),
-        },
     }
     celery_app.conf.update(beat_schedule=beat_schedule, imports=imports)
 
@@ -0,0 +1,11 @@
+from rag_app import RagApp
+
+
+def init_app(app: RagApp):
+    from commands import convert_upload_files_to_partitions
+
+    cmds_to_register = [
+        convert_upload_files_to_partitions,
+    ]
+    for cmd in cmds_to_register:
+        app.cli.add_command(cmd)
@@ -1,6 +1,9 @@
 from rag_app import RagApp
-from models.engine import db
+from configs import rag_config
+from models.engine import db, set_primary_until_cookie
 
 
 def init_app(app: RagApp):
     db.init_app(app)
+    if rag_config.SQLALCHEMY_REPLICA_URIS:
+        app.after_request(set_primary_until_cookie)
@@ -0,0 +1,28 @@
+import logging
+import os
+
+from flask import Response
+
+from configs import rag_config
+from rag_app import RagApp
+
+
+def is_enabled() -> bool:
+    return rag_config.METRICS_ENABLED
+
+
+def init_app(app: RagApp):
+    try:
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+    except ImportError:
+        logging.warning("prometheus_client is not installed, metrics endpoint is disabled")
+        return
+
+    @app.route(rag_config.METRICS_PATH)
+    def metrics():
+        registry = REGISTRY
+        # with several worker processes, PROMETHEUS_MULTIPROC_DIR makes them share their samples
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,90 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from configs import rag_config
+from extensions.ext_logging import get_request_id
+from rag_app import RagApp
+
+logger = logging.getLogger(__name__)
+
+# parameters of slow queries are cut to this many characters in the log
+MAX_LOGGED_PARAMETERS_LENGTH = 1000
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0
+    statements: Counter[str] = field(default_factory=Counter)
+
+
+def is_enabled() -> bool:
+    return rag_config.QUERY_STATS_ENABLED
+
+
+def init_app(app: RagApp):
+    # listening on the Engine class covers the primary and every replica
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    app.after_request(_log_request_queries)
+
+
+def get_query_stats() -> QueryStats | None:
+    """Return the query stats of the current request, None outside of one."""
+    if not flask.has_request_context():
+        return None
+    if "query_stats" not in flask.g:
+        flask.g.query_stats = QueryStats()
+    return flask.g.query_stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the execution context, which is dropped with a failed statement instead of lingering on the connection
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start_time
+
+    stats = get_query_stats()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+        stats.statements[statement] += 1
+
+    slow_query_threshold = rag_config.SLOW_QUERY_THRESHOLD_MS
+    if slow_query_threshold and duration * 1000 > slow_query_threshold:
+        logger.warning(
+            f"Slow query took {duration * 1000:.1f} ms: {statement} "
+            f"parameters: {repr(parameters)[:MAX_LOGGED_PARAMETERS_LENGTH]}"
+        )
+
+
+def _log_request_queries(response: flask.Response) -> flask.Response:
+    stats = flask.g.get("query_stats")
+    if stats is None:
+        return response
+
+    request = flask.request
+    summary = (
+        f"[{get_request_id()}] {request.method} {request.path} {response.status_code} "
+        f"ran {stats.count} queries in {stats.duration * 1000:.1f} ms"
+    )
+    if stats.count > rag_config.QUERY_STATS_MAX_QUERIES:
+        logger.warning(f"{summary}, more than {rag_config.QUERY_STATS_MAX_QUERIES} queries")
+    else:
+        logger.info(summary)
+
+    for statement, count in stats.statements.items():
+        if count > rag_config.QUERY_STATS_REPEATED_THRESHOLD:
+            logger.warning(f"[{get_request_id()}] Possible N+1 query, ran {count} times: {statement}")
+
+    return response
@@ -1,12 +1,20 @@
 import logging
-from collections.abc import Callable, Generator
-from typing import Literal, Union, overload
+import mmap
+import os
+import tempfile
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Generator, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Literal, Optional, Union, overload
 
 from flask import Flask
 
 from configs import rag_config
 from rag_app import RagApp
-from extensions.storage.base_storage import BaseStorage
+from extensions.storage import compression
+from extensions.storage.async_base_storage import AsyncBaseStorage
+from extensions.storage.base_storage import BaseStorage, BatchResult
+from extensions.storage.storage_metrics import StorageMetrics
 from extensions.storage.storage_type import StorageType
 
 logger = logging.getLogger(__name__)
@@ -17,6 +25,24 @@ class Storage:
         storage_factory = self.get_storage_factory(rag_config.STORAGE_TYPE)
         with app.app_context():
             self.storage_runner = storage_factory()
+        self.metrics = StorageMetrics(rag_config.STORAGE_TYPE, enabled=rag_config.METRICS_ENABLED)
+
+        if rag_config.STORAGE_CACHE_ENABLED and not self.is_local_storage():
+            from extensions.storage.cached_storage import CachedStorage
+
+            self.storage_runner = CachedStorage(
+                self.storage_runner,
+                cache_dir=rag_config.STORAGE_CACHE_PATH,
+                max_size=rag_config.STORAGE_CACHE_MAX_SIZE * 1024 * 1024,
+                max_object_size=rag_config.STORAGE_CACHE_MAX_OBJECT_SIZE * 1024 * 1024,
+            )
+
+    @staticmethod
+    def is_local_storage() -> bool:
+        # objects of these backends are already on local disk, a disk cache would only duplicate them
+        return rag_config.STORAGE_TYPE == StorageType.LOCAL or (
+            rag_config.STORAGE_TYPE == StorageType.OPENDAL and rag_config.OPENDAL_SCHEME in {"fs", "memory"}
+        )
 
     @staticmethod
     def get_storage_factory(storage_type: str) -> Callable[[], BaseStorage]:
@@ -72,9 +98,33 @@ class Storage:
             case _:
                 raise ValueError(f"unsupported storage type {storage_type}")
 
-    def save(self, filename, data):
+    @staticmethod
+    def encode(filename: str, data: bytes, mime_type: Optional[str] = None) -> tuple[str, bytes]:
+        """
+        Return the key and content to store an object under. With STORAGE_COMPRESSION_ENABLED, text-like objects
+        (by `mime_type` or extension) are compressed, under a key carrying their codec.
+        """
+        if (
+            not rag_config.STORAGE_COMPRESSION_ENABLED
+            or len(data) < rag_config.STORAGE_COMPRESSION_MIN_SIZE
+            or not compression.is_compressible(filename, mime_type)
+        ):
+            return filename, data
+        return compression.compress(filename, data) or (filename, data)
+
+    def save(self, filename, data, mime_type: Optional[str] = None, *, compress: bool = False) -> str:
+        """
+        Save an object and return the key it is stored under. With `compress`, the object may be stored
+        compressed under another key (see `encode`), which callers must keep. All load methods return
+        compressed objects decompressed.
+        """
         try:
-            self.storage_runner.save(filename, data)
+            if compress:
+                filename, data = self.encode(filename, data, mime_type)
+            with self.metrics.track("save") as observation:
+                observation.size = len(data)
+                self.storage_runner.save(filename, data)
+            return filename
         except Exception as e:
             logger.exception(f"Failed to save file {filename}")
             raise e
@@ -97,42 +147,319 @@ class Storage:
 
     def load_once(self, filename: str) -> bytes:
         try:
-            return self.storage_runner.load_once(filename)
+            with self.metrics.track("load_once") as observation:
+                data = self.storage_runner.load_once(filename)
+                observation.size = len(data)
+            codec = compression.get_codec(filename)
+            return compression.decompress(data, codec) if codec else data
+        except FileNotFoundError:
+            # callers probing for an optional object handle a miss themselves
+            raise
         except Exception as e:
             logger.exception(f"Failed to load_once file {filename}")
             raise e
 
     def load_stream(self, filename: str) -> Generator:
         try:
-            return self.storage_runner.load_stream(filename)
+            stream = self.metrics.track_stream("load_stream", self.storage_runner.load_stream(filename))
+            codec = compression.get_codec(filename)
+            return compression.decompress_stream(stream, codec) if codec else stream
         except Exception as e:
             logger.exception(f"Failed to load_stream file {filename}")
             raise e
 
+    def load_range(self, filename: str, start: int, end: int) -> Iterator[bytes]:
+        """Stream the bytes in [start, end) of the object."""
+        try:
+            if compression.get_codec(filename):
+                # a range of a compressed object can only be served by decompressing from its start
+                return compression.slice_stream(self.load_stream(filename), start, end)
+            return self.metrics.track_stream("load_range", self.storage_runner.load_range(filename, start, end))
+        except Exception as e:
+            logger.exception(f"Failed to load_range file {filename}")
+            raise e
+
     def download(self, filename, target_filepath):
         try:
-            self.storage_runner.download(filename, target_filepath)
+            with self.metrics.track("download") as observation:
+                self.storage_runner.download(filename, target_filepath)
+                observation.size = os.path.getsize(target_filepath)
+            if codec := compression.get_codec(filename):
+                compression.decompress_file(target_filepath, codec)
         except Exception as e:
             logger.exception(f"Failed to download file {filename}")
             raise e
 
+    def get_local_path(self, filename: str) -> Optional[str]:
+        try:
+            # the file on disk of a compressed object is not its content
+            if compression.get_codec(filename):
+                return None
+            return self.storage_runner.get_local_path(filename)
+        except Exception as e:
+            logger.exception(f"Failed to get local path of file {filename}")
+            raise e
+
+    @contextmanager
+    def local_file(self, filename: str) -> Generator[str, None, None]:
+        """
+        Yield a local filesystem path for the object, for consumers that can only read from a path.
+        Objects already on local disk are used in place, others are downloaded to a temporary file
+        that is removed on exit.
+        """
+        local_path = self.get_local_path(filename)
+        if local_path:
+            yield local_path
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            target_filepath = str(Path(temp_dir) / Path(filename).name)
+            self.download(filename, target_filepath)
+            yield target_filepath
+
+    @contextmanager
+    def open_file(self, filename: str) -> Generator[IO[bytes], None, None]:
+        """
+        Yield a readable, seekable binary file object for the object.
+        Objects on local disk are opened in place, others are streamed into a spooled buffer which only
+        spills to disk once it grows beyond STORAGE_SPOOL_MAX_SIZE.
+        """
+        local_path = self.get_local_path(filename)
+        if local_path:
+            with open(local_path, "rb") as f:
+                yield f
+            return
+
+        with tempfile.SpooledTemporaryFile(max_size=rag_config.STORAGE_SPOOL_MAX_SIZE) as spooled:
+            for chunk in self.load_stream(filename):
+                spooled.write(chunk)
+            spooled.seek(0)
+            yield spooled  # type: ignore[misc]
+
+    @contextmanager
+    def load_view(self, filename: str) -> Generator[memoryview, None, None]:
+        """
+        Yield a read-only memoryview of the object content.
+        Objects on local disk are memory-mapped instead of being read into memory.
+        The view must not be used after the context exits.
+        """
+        local_path = self.get_local_path(filename)
+        if not local_path:
+            yield memoryview(self.load_once(filename))
+            return
+
+        with open(local_path, "rb") as f:
+            if Path(local_path).stat().st_size == 0:
+                yield memoryview(b"")
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
     def exists(self, filename):
         try:
-            return self.storage_runner.exists(filename)
+            with self.metrics.track("exists"):
+                return self.storage_runner.exists(filename)
         except Exception as e:
             logger.exception(f"Failed to check file exists {filename}")
             raise e
 
     def delete(self, filename):
         try:
-            return self.storage_runner.delete(filename)
+            with self.metrics.track("delete"):
+                return self.storage_runner.delete(filename)
+        except Exception as e:
+            logger.exception(f"Failed to delete file {filename}")
+            raise e
+
+    @staticmethod
+    def _log_batch_failures(operation: str, results: BatchResult) -> BatchResult:
+        failed = [key for key, result in results.items() if isinstance(result, Exception)]
+        if failed:
+            logger.warning(f"Failed to {operation} {len(failed)} of {len(results)} files, e.g. {failed[:5]}")
+        return results
+
+    @staticmethod
+    def _decompress_batch(results: BatchResult[bytes]) -> BatchResult[bytes]:
+        decompressed: BatchResult[bytes] = {}
+        for filename, data in results.items():
+            codec = compression.get_codec(filename)
+            decompressed[filename] = compression.decompress(data, codec) if codec and isinstance(data, bytes) else data
+        return decompressed
+
+    def _record_batch_failures(self, operation: str, results: BatchResult):
+        for result in results.values():
+            if isinstance(result, Exception):
+                self.metrics.count_errors(operation, type(result).__name__)
+
+    def save_many(self, items: dict[str, bytes], max_workers: Optional[int] = None) -> BatchResult[None]:
+        """
+        Save several objects concurrently, as they are under their keys.
+        Return the outcome per key, None on success or the raised exception, instead of failing the whole batch.
+        """
+        with self.metrics.track("save_many") as observation:
+            observation.size = sum(len(data) for data in items.values())
+            results = self.storage_runner.save_many(items, max_workers or rag_config.STORAGE_BATCH_CONCURRENCY)
+        self._record_batch_failures("save_many", results)
+        return self._log_batch_failures("save", results)
+
+    def load_many(self, filenames: Iterable[str], max_workers: Optional[int] = None) -> BatchResult[bytes]:
+        with self.metrics.track("load_many") as observation:
+            results = self.storage_runner.load_many(filenames, max_workers or rag_config.STORAGE_BATCH_CONCURRENCY)
+            observation.size = sum(len(data) for data in results.values() if isinstance(data, bytes))
+        self._record_batch_failures("load_many", results)
+        results = self._decompress_batch(results)
+        return self._log_batch_failures("load", results)
+
+    def exists_many(self, filenames: Iterable[str], max_workers: Optional[int] = None) -> BatchResult[bool]:
+        with self.metrics.track("exists_many"):
+            results = self.storage_runner.exists_many(filenames, max_workers or rag_config.STORAGE_BATCH_CONCURRENCY)
+        self._record_batch_failures("exists_many", results)
+        return self._log_batch_failures("check exists of", results)
+
+    def delete_many(self, filenames: Iterable[str], max_workers: Optional[int] = None) -> BatchResult:
+        with self.metrics.track("delete_many"):
+            results = self.storage_runner.delete_many(filenames, max_workers or rag_config.STORAGE_BATCH_CONCURRENCY)
+        self._record_batch_failures("delete_many", results)
+        return self._log_batch_failures("delete", results)
+
+
+class AsyncStorage:
+    """
+    Asyncio-native counterpart of `Storage`, for code that overlaps many object store requests on one worker.
+    Only OpenDAL backed storage types have an async implementation, `is_available` is False for the others.
+    From synchronous code, run its coroutines through `libs.async_bridge.run_coroutine`.
+    """
+
+    storage_runner: Optional[AsyncBaseStorage] = None
+
+    def init_app(self, app: Flask):
+        storage_factory = self.get_storage_factory(rag_config.STORAGE_TYPE)
+        if storage_factory is None:
+            return
+        with app.app_context():
+            self.storage_runner = storage_factory()
+
+    @staticmethod
+    def get_storage_factory(storage_type: str) -> Optional[Callable[[], AsyncBaseStorage]]:
+        match storage_type:
+            case StorageType.OPENDAL:
+                from extensions.storage.async_opendal_storage import AsyncOpenDALStorage
+
+                return lambda: AsyncOpenDALStorage(rag_config.OPENDAL_SCHEME)
+            case StorageType.LOCAL:
+                from extensions.storage.async_opendal_storage import AsyncOpenDALStorage
+
+                return lambda: AsyncOpenDALStorage(scheme="fs", root=rag_config.STORAGE_LOCAL_PATH)
+            case _:
+                return None
+
+    @property
+    def is_available(self) -> bool:
+        return self.storage_runner is not None
+
+    @property
+    def runner(self) -> AsyncBaseStorage:
+        if self.storage_runner is None:
+            raise RuntimeError(f"storage type {rag_config.STORAGE_TYPE} has no async implementation")
+        return self.storage_runner
+
+    async def save(
+        self, filename: str, data: bytes, mime_type: Optional[str] = None, *, compress: bool = False
+    ) -> str:
+        try:
+            if compress:
+                filename, data = Storage.encode(filename, data, mime_type)
+            await self.runner.save(filename, data)
+            return filename
+        except Exception as e:
+            logger.exception(f"Failed to save file {filename}")
+            raise e
+
+    async def load_once(self, filename: str) -> bytes:
+        try:
+            data = await self.runner.load_once(filename)
+            codec = compression.get_codec(filename)
+            return compression.decompress(data, codec) if codec else data
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            logger.exception(f"Failed to load_once file {filename}")
+            raise e
+
+    def load_stream(self, filename: str) -> AsyncIterator[bytes]:
+        stream = self.runner.load_stream(filename)
+        codec = compression.get_codec(filename)
+        return compression.decompress_async_stream(stream, codec) if codec else stream
+
+    async def load_range(self, filename: str, start: int, end: int) -> AsyncGenerator[bytes, None]:
+        """Stream the bytes in [start, end) of the object."""
+        if compression.get_codec(filename):
+            position = 0
+            async for chunk in self.load_stream(filename):
+                chunk_end = position + len(chunk)
+                if chunk_end > start:
+                    yield chunk[max(start - position, 0) : end - position]
+                position = chunk_end
+                if position >= end:
+                    return
+            return
+
+        async for chunk in self.runner.load_range(filename, start, end):
+            yield chunk
+
+    async def download(self, filename: str, target_filepath: str):
+        try:
+            await self.runner.download(filename, target_filepath)
+            if codec := compression.get_codec(filename):
+                compression.decompress_file(target_filepath, codec)
+        except Exception as e:
+            logger.exception(f"Failed to download file {filename}")
+            raise e
+
+    async def exists(self, filename: str) -> bool:
+        try:
+            return await self.runner.exists(filename)
+        except Exception as e:
+            logger.exception(f"Failed to check file exists {filename}")
+            raise e
+
+    async def delete(self, filename: str):
+        try:
+            await self.runner.delete(filename)
         except Exception as e:
             logger.exception(f"Failed to delete file {filename}")
             raise e
 
+    async def save_many(self, items: dict[str, bytes], max_concurrency: Optional[int] = None) -> BatchResult[None]:
+        results = await self.runner.save_many(items, max_concurrency or rag_config.STORAGE_BATCH_CONCURRENCY)
+        return Storage._log_batch_failures("save", results)
+
+    async def load_many(
+        self, filenames: Iterable[str], max_concurrency: Optional[int] = None
+    ) -> BatchResult[bytes]:
+        results = await self.runner.load_many(filenames, max_concurrency or rag_config.STORAGE_BATCH_CONCURRENCY)
+        return Storage._log_batch_failures("load", Storage._decompress_batch(results))
+
+    async def exists_many(
+        self, filenames: Iterable[str], max_concurrency: Optional[int] = None
+    ) -> BatchResult[bool]:
+        results = await self.runner.exists_many(filenames, max_concurrency or rag_config.STORAGE_BATCH_CONCURRENCY)
+        return Storage._log_batch_failures("check exists of", results)
+
+    async def delete_many(self, filenames: Iterable[str], max_concurrency: Optional[int] = None) -> BatchResult:
+        results = await self.runner.delete_many(filenames, max_concurrency or rag_config.STORAGE_BATCH_CONCURRENCY)
+        return Storage._log_batch_failures("delete", results)
+
 
 storage = Storage()
+async_storage = AsyncStorage()
 
 
 def init_app(app: RagApp):
     storage.init_app(app)
+    async_storage.init_app(app)
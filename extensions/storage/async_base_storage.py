@@ -0,0 +1,71 @@
+"""Abstract interface for asyncio-native file storage implementations."""
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterable
+from typing import Any, TypeVar, Union
+
+from extensions.storage.base_storage import BatchResult
+
+T = TypeVar("T")
+
+
+async def run_async_batch(
+    func: Callable[[str], Awaitable[T]], keys: Iterable[str], max_concurrency: int
+) -> BatchResult[T]:
+    """Await `func` for every key with at most `max_concurrency` calls in flight, without stopping at failures."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call(key: str) -> Union[T, Exception]:
+        async with semaphore:
+            try:
+                return await func(key)
+            except Exception as e:
+                return e
+
+    keys = list(dict.fromkeys(keys))
+    return dict(zip(keys, await asyncio.gather(*(call(key) for key in keys))))
+
+
+class AsyncBaseStorage(ABC):
+    """Interface for asyncio-native file storage."""
+
+    @abstractmethod
+    async def save(self, filename: str, data: bytes):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def load_once(self, filename: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_stream(self, filename: str) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_range(self, filename: str, start: int, end: int) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def download(self, filename: str, target_filepath: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists(self, filename: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, filename: str):
+        raise NotImplementedError
+
+    async def save_many(self, items: dict[str, bytes], max_concurrency: int) -> BatchResult[None]:
+        return await run_async_batch(lambda filename: self.save(filename, items[filename]), items, max_concurrency)
+
+    async def load_many(self, filenames: Iterable[str], max_concurrency: int) -> BatchResult[bytes]:
+        return await run_async_batch(self.load_once, filenames, max_concurrency)
+
+    async def exists_many(self, filenames: Iterable[str], max_concurrency: int) -> BatchResult[bool]:
+        return await run_async_batch(self.exists, filenames, max_concurrency)
+
+    async def delete_many(self, filenames: Iterable[str], max_concurrency: int) -> BatchResult[Any]:
+        return await run_async_batch(self.delete, filenames, max_concurrency)
@@ -0,0 +1,90 @@
+import logging
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from typing import Optional
+
+import opendal  # type: ignore[import]
+
+from configs import rag_config
+from extensions.storage.async_base_storage import AsyncBaseStorage
+from extensions.storage.opendal_storage import OpenDALStorage, _get_opendal_kwargs, _translate_not_found
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenDALStorage(AsyncBaseStorage):
+    def __init__(self, scheme: str, **kwargs):
+        kwargs = kwargs or _get_opendal_kwargs(scheme=scheme)
+
+        if scheme == "fs":
+            root = kwargs.get("root", "storage")
+            Path(root).mkdir(parents=True, exist_ok=True)
+
+        self.min_chunk_size = rag_config.OPENDAL_STREAM_MIN_CHUNK_SIZE
+        self.max_chunk_size = rag_config.OPENDAL_STREAM_MAX_CHUNK_SIZE
+        if scheme in OpenDALStorage.LOCAL_SCHEMES:
+            self.max_chunk_size = min(self.max_chunk_size, OpenDALStorage.LOCAL_MAX_CHUNK_SIZE)
+        self.min_chunk_size = min(self.min_chunk_size, self.max_chunk_size)
+
+        self.op = opendal.AsyncOperator(scheme=scheme, **kwargs)  # type: ignore
+        logger.debug(f"opendal async operator created with scheme {scheme}")
+        retry_layer = opendal.layers.RetryLayer(max_times=3, factor=2.0, jitter=True)
+        self.op = self.op.layer(retry_layer)
+        logger.debug("added retry layer to opendal async operator")
+
+    async def _iter_chunks(self, file, length: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        chunk_size = self.min_chunk_size
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = await file.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+            chunk_size = min(chunk_size * 2, self.max_chunk_size)
+
+    async def save(self, filename: str, data: bytes):
+        await self.op.write(filename, data)
+        logger.debug(f"file {filename} saved")
+
+    async def load_once(self, filename: str) -> bytes:
+        with _translate_not_found(filename):
+            content: bytes = await self.op.read(filename)
+        logger.debug(f"file {filename} loaded")
+        return content
+
+    async def load_stream(self, filename: str) -> AsyncGenerator[bytes, None]:
+        with _translate_not_found(filename):
+            file = await self.op.open(filename, "rb")
+        async with file:
+            async for chunk in self._iter_chunks(file):
+                yield chunk
+        logger.debug(f"file {filename} loaded as stream")
+
+    async def load_range(self, filename: str, start: int, end: int) -> AsyncGenerator[bytes, None]:
+        with _translate_not_found(filename):
+            file = await self.op.open(filename, "rb")
+        async with file:
+            await file.seek(start)
+            async for chunk in self._iter_chunks(file, end - start):
+                yield chunk
+        logger.debug(f"file {filename} loaded as stream from {start} to {end}")
+
+    async def download(self, filename: str, target_filepath: str):
+        with _translate_not_found(filename):
+            file = await self.op.open(filename, "rb")
+        async with file:
+            with Path(target_filepath).open("wb") as f:
+                async for chunk in self._iter_chunks(file):
+                    f.write(chunk)
+        logger.debug(f"file {filename} downloaded to {target_filepath}")
+
+    async def exists(self, filename: str) -> bool:
+        res: bool = await self.op.exists(filename)
+        return res
+
+    async def delete(self, filename: str):
+        await self.op.delete(filename)
+        logger.debug(f"file {filename} deleted")
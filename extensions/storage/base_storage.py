@@ -1,7 +1,31 @@
 """Abstract interface for file storage implementations."""
 
 from abc import ABC, abstractmethod
-from collections.abc import Generator
+from collections.abc import Callable, Generator, Iterable
+from typing import Any, Optional, TypeVar, Union
+
+from libs.async_bridge import map_blocking
+
+T = TypeVar("T")
+
+# result of a batch operation per key: the value of the single-object operation, or the exception it raised
+BatchResult = dict[str, Union[T, Exception]]
+
+
+def run_batch(func: Callable[[str], T], keys: Iterable[str], max_workers: int) -> BatchResult[T]:
+    """Apply `func` to every key with at most `max_workers` calls in flight, without stopping at failures."""
+
+    def call(key: str) -> Union[T, Exception]:
+        try:
+            return func(key)
+        except Exception as e:
+            return e
+
+    keys = list(dict.fromkeys(keys))
+    if len(keys) <= 1 or max_workers <= 1:
+        return {key: call(key) for key in keys}
+
+    return dict(zip(keys, map_blocking(call, keys, max_workers)))
 
 
 class BaseStorage(ABC):
@@ -19,6 +43,20 @@ class BaseStorage(ABC):
     def load_stream(self, filename: str) -> Generator:
         raise NotImplementedError
 
+    def load_range(self, filename: str, start: int, end: int) -> Generator:
+        """
+        Stream the bytes in [start, end) of the object.
+        Backends that can read at an offset should override this, the default skips through the full stream.
+        """
+        position = 0
+        for chunk in self.load_stream(filename):
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                yield chunk[max(start - position, 0) : end - position]
+            position = chunk_end
+            if position >= end:
+                break
+
     @abstractmethod
     def download(self, filename, target_filepath):
         raise NotImplementedError
@@ -30,3 +68,26 @@ class BaseStorage(ABC):
     @abstractmethod
     def delete(self, filename):
         raise NotImplementedError
+
+    def get_local_path(self, filename: str) -> Optional[str]:
+        """
+        Return the path of the object on local disk, or None if the backend does not keep it locally.
+        Callers must treat the returned file as read-only.
+        """
+        return None
+
+    def save_many(self, items: dict[str, bytes], max_workers: int) -> BatchResult[None]:
+        return run_batch(lambda filename: self.save(filename, items[filename]), items, max_workers)
+
+    def load_many(self, filenames: Iterable[str], max_workers: int) -> BatchResult[bytes]:
+        return run_batch(self.load_once, filenames, max_workers)
+
+    def exists_many(self, filenames: Iterable[str], max_workers: int) -> BatchResult[bool]:
+        return run_batch(self.exists, filenames, max_workers)
+
+    def delete_many(self, filenames: Iterable[str], max_workers: int) -> BatchResult[Any]:
+        """
+        Delete the objects concurrently.
+        Backends with a native multi-object delete should override this to use it.
+        """
+        return run_batch(self.delete, filenames, max_workers)
@@ -0,0 +1,267 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Generator, Iterable
+from pathlib import Path
+from typing import Optional
+
+from extensions.storage.base_storage import BaseStorage, BatchResult
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_file(path) -> str:
+    content_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+class CachedStorage(BaseStorage):
+    """
+    Read-through cache on local disk in front of another storage.
+
+    Entries are stored under a digest of the storage key together with a `.sha256` file holding the digest of
+    their content, which is checked when an entry is read so a corrupted entry is dropped instead of served.
+    The mtime of an entry is refreshed on every hit, and once the cache grows beyond `max_size` the entries with
+    the oldest mtime are evicted. As mtimes live on disk, the cache can be shared by all workers of a host.
+
+    Reads trust an entry without asking the wrapped storage, `exists` always asks it and drops the entry of an
+    object deleted elsewhere.
+    """
+
+    DIGEST_SUFFIX = ".sha256"
+    TEMP_SUFFIX = ".tmp"
+    STALE_TEMP_FILE_AGE = 60 * 60
+
+    def __init__(self, storage: BaseStorage, cache_dir: str, max_size: int, max_object_size: int):
+        self.storage = storage
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.max_object_size = max_object_size
+
+        self._lock = threading.Lock()
+        self._size_estimate = self._scan()[1]
+
+    def _entry_path(self, filename: str) -> Path:
+        digest = hashlib.sha256(filename.encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / digest
+
+    @classmethod
+    def _digest_path(cls, path: Path) -> Path:
+        return path.with_name(path.name + cls.DIGEST_SUFFIX)
+
+    def _scan(self) -> tuple[list[tuple[float, int, Path]], int]:
+        entries = []
+        total_size = 0
+        stale_before = time.time() - self.STALE_TEMP_FILE_AGE
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.endswith(self.DIGEST_SUFFIX):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name.endswith(self.TEMP_SUFFIX):
+                # left behind by a worker that died while filling the cache
+                if stat.st_mtime < stale_before:
+                    path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+        return entries, total_size
+
+    def _remove_entry(self, path: Path):
+        path.unlink(missing_ok=True)
+        self._digest_path(path).unlink(missing_ok=True)
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size_estimate <= self.max_size:
+                return
+
+            # other workers fill the same directory, so rescan instead of trusting the local estimate
+            entries, total_size = self._scan()
+            target_size = int(self.max_size * 0.9)
+            for _, size, path in sorted(entries):
+                if total_size <= target_size:
+                    break
+                self._remove_entry(path)
+                total_size -= size
+            self._size_estimate = total_size
+
+    def _open_entry(self, filename: str) -> tuple[Optional[Path], Optional[str]]:
+        """Return the path of a cached entry and its expected content digest, or (None, None) on a miss."""
+        path = self._entry_path(filename)
+        try:
+            expected_digest = self._digest_path(path).read_text()
+            os.utime(path)
+        except FileNotFoundError:
+            return None, None
+        return path, expected_digest
+
+    def _new_temp_file(self, filename: str) -> tuple[int, str]:
+        path = self._entry_path(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=path.parent, suffix=self.TEMP_SUFFIX)
+
+    def _put(self, filename: str, data: bytes):
+        if len(data) > self.max_object_size:
+            return
+        try:
+            fd, temp_path = self._new_temp_file(filename)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            self._commit_entry(filename, temp_path, hashlib.sha256(data).hexdigest())
+        except OSError:
+            logger.exception(f"Failed to cache file {filename}")
+
+    def _put_file(self, filename: str, source_path: str):
+        if os.path.getsize(source_path) > self.max_object_size:
+            return
+        try:
+            fd, temp_path = self._new_temp_file(filename)
+            os.close(fd)
+            shutil.copyfile(source_path, temp_path)
+            self._commit_entry(filename, temp_path, _hash_file(temp_path))
+        except OSError:
+            logger.exception(f"Failed to cache file {filename}")
+
+    def _commit_entry(self, filename: str, temp_path: str, content_digest: str):
+        path = self._entry_path(filename)
+        try:
+            # the digest goes first, an entry without its digest file is treated as a miss
+            self._digest_path(path).write_text(content_digest)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+
+        with self._lock:
+            self._size_estimate += size
+        self._evict_if_needed()
+
+    def save(self, filename, data):
+        self.storage.save(filename, data)
+        self._put(filename, data)
+
+    def load_once(self, filename: str) -> bytes:
+        path, expected_digest = self._open_entry(filename)
+        if path:
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                data = None
+            if data is not None and hashlib.sha256(data).hexdigest() == expected_digest:
+                return data
+            if data is not None:
+                logger.warning(f"Cached file {filename} is corrupted, reloading it")
+                self._remove_entry(path)
+
+        data = self.storage.load_once(filename)
+        self._put(filename, data)
+        return data
+
+    def load_stream(self, filename: str) -> Generator:
+        path, expected_digest = self._open_entry(filename)
+        if path:
+            try:
+                f = path.open("rb")
+            except FileNotFoundError:
+                f = None
+            if f:
+                with f:
+                    yield from self._stream_entry(filename, f, path, expected_digest)
+                return
+
+        yield from self._stream_and_fill(filename)
+
+    def _stream_entry(self, filename: str, f, path: Path, expected_digest: Optional[str]) -> Generator:
+        content_hash = hashlib.sha256()
+        while chunk := f.read(1024 * 1024):
+            content_hash.update(chunk)
+            yield chunk
+        # the content is already sent, a mismatch can only keep the next reader from getting it
+        if content_hash.hexdigest() != expected_digest:
+            logger.warning(f"Cached file {filename} is corrupted, evicting it")
+            self._remove_entry(path)
+
+    def _stream_and_fill(self, filename: str) -> Generator:
+        fd, temp_path = self._new_temp_file(filename)
+        try:
+            content_hash = hashlib.sha256()
+            written = 0
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in self.storage.load_stream(filename):
+                    if written <= self.max_object_size:
+                        temp_file.write(chunk)
+                        content_hash.update(chunk)
+                    written += len(chunk)
+                    yield chunk
+
+            if written <= self.max_object_size:
+                self._commit_entry(filename, temp_path, content_hash.hexdigest())
+        finally:
+            # left over when the consumer stopped early or the object is too large to cache
+            Path(temp_path).unlink(missing_ok=True)
+
+    def load_range(self, filename: str, start: int, end: int) -> Generator:
+        path, _ = self._open_entry(filename)
+        if path:
+            try:
+                f = path.open("rb")
+            except FileNotFoundError:
+                f = None
+            if f:
+                with f:
+                    f.seek(start)
+                    remaining = end - start
+                    while remaining > 0 and (chunk := f.read(min(1024 * 1024, remaining))):
+                        remaining -= len(chunk)
+                        yield chunk
+                return
+
+        yield from self.storage.load_range(filename, start, end)
+
+    def download(self, filename, target_filepath):
+        path, expected_digest = self._open_entry(filename)
+        if path:
+            try:
+                shutil.copyfile(path, target_filepath)
+                if _hash_file(target_filepath) == expected_digest:
+                    return
+                logger.warning(f"Cached file {filename} is corrupted, reloading it")
+                self._remove_entry(path)
+            except FileNotFoundError:
+                pass
+
+        self.storage.download(filename, target_filepath)
+        self._put_file(filename, target_filepath)
+
+    def exists(self, filename):
+        # another host or the cleanup task may have deleted the object, only the wrapped storage can tell
+        exists = self.storage.exists(filename)
+        if not exists:
+            self._remove_entry(self._entry_path(filename))
+        return exists
+
+    def delete(self, filename):
+        self._remove_entry(self._entry_path(filename))
+        return self.storage.delete(filename)
+
+    def delete_many(self, filenames: Iterable[str], max_workers: int) -> BatchResult:
+        filenames = list(filenames)
+        for filename in filenames:
+            self._remove_entry(self._entry_path(filename))
+        # keep the wrapped storage's native batch delete, if it has one
+        return self.storage.delete_many(filenames, max_workers)
+
+    def get_local_path(self, filename: str) -> Optional[str]:
+        # entries may be evicted at any time, only hand out paths the wrapped storage owns
+        return self.storage.get_local_path(filename)
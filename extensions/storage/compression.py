@@ -0,0 +1,151 @@
+"""
+Optional compression of stored objects.
+
+The codec of a compressed object is part of its key, a `COMPRESSED_KEY_PREFIXES` prefix in front of the key it
+was saved under, so only objects written compressed are ever decompressed, whatever their content. The prefix
+keeps the file extension of the key, which parsers rely on.
+"""
+
+import os
+import zlib
+from collections.abc import AsyncIterator, Iterable, Iterator
+from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+COMPRESSED_KEY_PREFIXES = {codec: f"compressed/{codec}/" for codec in (CODEC_ZSTD, CODEC_ZLIB)}
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+# keep the raw object unless compression saves at least a tenth of it
+MAX_COMPRESSION_RATIO = 0.9
+
+COMPRESSIBLE_EXTENSIONS = {
+    "txt",
+    "text",
+    "md",
+    "markdown",
+    "mdx",
+    "csv",
+    "tsv",
+    "html",
+    "htm",
+    "xml",
+    "json",
+    "jsonl",
+    "yaml",
+    "yml",
+    "log",
+    "svg",
+    "vtt",
+    "srt",
+    "eml",
+}
+COMPRESSIBLE_MIME_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/yaml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(filename: str, mime_type: Optional[str] = None) -> bool:
+    """Whether an object is text-like by its MIME type or extension. PDF, Office documents and media are not."""
+    if mime_type:
+        mime_type = mime_type.split(";")[0].strip().lower()
+        if mime_type.startswith("text/") or mime_type in COMPRESSIBLE_MIME_TYPES:
+            return True
+    return Path(filename).suffix.lstrip(".").lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def get_codec(filename: str) -> Optional[str]:
+    """The codec an object was stored compressed with, from its key, or None for an object stored as it is."""
+    for codec, prefix in COMPRESSED_KEY_PREFIXES.items():
+        if filename.startswith(prefix):
+            return codec
+    return None
+
+
+def strip_codec(filename: str) -> str:
+    """The key an object was saved under, without the prefix of its codec."""
+    codec = get_codec(filename)
+    return filename[len(COMPRESSED_KEY_PREFIXES[codec]) :] if codec else filename
+
+
+def compress(filename: str, data: bytes) -> Optional[tuple[str, bytes]]:
+    """Return the key and content of the compressed object, or None when compression does not pay off."""
+    if zstandard is not None:
+        codec = CODEC_ZSTD
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        codec = CODEC_ZLIB
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+
+    if len(compressed) > len(data) * MAX_COMPRESSION_RATIO:
+        return None
+    return f"{COMPRESSED_KEY_PREFIXES[codec]}{filename}", compressed
+
+
+def _get_decompressor(codec: str):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("object is compressed with zstd, but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj()
+    elif codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    raise ValueError(f"unknown compression codec {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    decompressor = _get_decompressor(codec)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def decompress_stream(chunks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    decompressor = _get_decompressor(codec)
+    for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+    if data := decompressor.flush():
+        yield data
+
+
+async def decompress_async_stream(chunks: AsyncIterator[bytes], codec: str) -> AsyncIterator[bytes]:
+    decompressor = _get_decompressor(codec)
+    async for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+    if data := decompressor.flush():
+        yield data
+
+
+def slice_stream(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    """Yield the bytes in [start, end) of a stream."""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0) : end - position]
+        position = chunk_end
+        if position >= end:
+            break
+
+
+def decompress_file(path: str, codec: str):
+    """Decompress a downloaded object in place."""
+    temp_path = f"{path}.decompressing"
+    try:
+        with open(path, "rb") as src, open(temp_path, "wb") as dst:
+            for data in decompress_stream(iter(lambda: src.read(1024 * 1024), b""), codec):
+                dst.write(data)
+        os.replace(temp_path, path)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
@@ -1,11 +1,16 @@
+import errno
 import logging
 import os
+import shutil
 from collections.abc import Generator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
 import opendal  # type: ignore[import]
 from dotenv import dotenv_values
 
+from configs import rag_config
 from extensions.storage.base_storage import BaseStorage
 
 logger = logging.getLogger(__name__)
@@ -26,13 +31,57 @@ def _get_opendal_kwargs(*, scheme: str, env_file_path: str = ".env", prefix: str
     return kwargs
 
 
+@contextmanager
+def _translate_not_found(filename: str) -> Generator[None, None, None]:
+    """Map OpenDAL's not-found error to FileNotFoundError, so callers need no extra `exists` round trip."""
+    try:
+        yield
+    except opendal.exceptions.NotFound as e:
+        raise FileNotFoundError(f"File not found: {filename}") from e
+
+
+def _copy_local_file(source: str, target: str):
+    """
+    Copy a file inside the kernel. copy_file_range can reflink on filesystems that support it, and
+    shutil.copyfile falls back to sendfile, so the content never passes through Python buffers.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return
+        except OSError as e:
+            # e.g. source and target on different filesystems, or a kernel without support
+            if e.errno not in {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}:
+                raise
+
+    shutil.copyfile(source, target)
+
+
 class OpenDALStorage(BaseStorage):
+    # schemes without per-request network latency, large reads there only cost memory
+    LOCAL_SCHEMES = {"fs", "memory"}
+    LOCAL_MAX_CHUNK_SIZE = 1024 * 1024
+
     def __init__(self, scheme: str, **kwargs):
         kwargs = kwargs or _get_opendal_kwargs(scheme=scheme)
 
+        self.local_root: Optional[Path] = None
         if scheme == "fs":
             root = kwargs.get("root", "storage")
             Path(root).mkdir(parents=True, exist_ok=True)
+            self.local_root = Path(root).resolve()
+
+        self.min_chunk_size = rag_config.OPENDAL_STREAM_MIN_CHUNK_SIZE
+        self.max_chunk_size = rag_config.OPENDAL_STREAM_MAX_CHUNK_SIZE
+        if scheme in self.LOCAL_SCHEMES:
+            self.max_chunk_size = min(self.max_chunk_size, self.LOCAL_MAX_CHUNK_SIZE)
+        self.min_chunk_size = min(self.min_chunk_size, self.max_chunk_size)
 
         self.op = opendal.Operator(scheme=scheme, **kwargs)  # type: ignore
         logger.debug(f"opendal operator created with scheme {scheme}")
@@ -40,43 +89,70 @@ class OpenDALStorage(BaseStorage):
         self.op = self.op.layer(retry_layer)
         logger.debug("added retry layer to opendal operator")
 
+    def _iter_chunks(self, file, length: Optional[int] = None) -> Generator[bytes, None, None]:
+        """
+        Read `file` in chunks that start at the minimum chunk size and double up to the maximum.
+        Small objects finish in one small read, large ones quickly reach few, large Python<->Rust calls.
+        """
+        chunk_size = self.min_chunk_size
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = file.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+            chunk_size = min(chunk_size * 2, self.max_chunk_size)
+
     def save(self, filename: str, data: bytes) -> None:
         self.op.write(path=filename, bs=data)
         logger.debug(f"file {filename} saved")
 
     def load_once(self, filename: str) -> bytes:
-        if not self.exists(filename):
-            raise FileNotFoundError("File not found")
-
-        content: bytes = self.op.read(path=filename)
+        with _translate_not_found(filename):
+            content: bytes = self.op.read(path=filename)
         logger.debug(f"file {filename} loaded")
         return content
 
     def load_stream(self, filename: str) -> Generator:
-        if not self.exists(filename):
-            raise FileNotFoundError("File not found")
-
-        batch_size = 4096
-        file = self.op.open(path=filename, mode="rb")
-        while chunk := file.read(batch_size):
-            yield chunk
+        with _translate_not_found(filename), self.op.open(path=filename, mode="rb") as file:
+            yield from self._iter_chunks(file)
         logger.debug(f"file {filename} loaded as stream")
 
+    def load_range(self, filename: str, start: int, end: int) -> Generator:
+        with _translate_not_found(filename), self.op.open(path=filename, mode="rb") as file:
+            file.seek(start)
+            yield from self._iter_chunks(file, end - start)
+        logger.debug(f"file {filename} loaded as stream from {start} to {end}")
+
     def download(self, filename: str, target_filepath: str):
-        if not self.exists(filename):
-            raise FileNotFoundError("File not found")
+        local_path = self.get_local_path(filename)
+        if local_path:
+            _copy_local_file(local_path, target_filepath)
+            logger.debug(f"file {filename} copied to {target_filepath}")
+            return
 
-        with Path(target_filepath).open("wb") as f:
-            f.write(self.op.read(path=filename))
+        # open the object before creating the target, so a missing object leaves no empty file behind
+        with _translate_not_found(filename), self.op.open(path=filename, mode="rb") as file:
+            with Path(target_filepath).open("wb") as f:
+                for chunk in self._iter_chunks(file):
+                    f.write(chunk)
         logger.debug(f"file {filename} downloaded to {target_filepath}")
 
+    def get_local_path(self, filename: str) -> Optional[str]:
+        if self.local_root is None:
+            return None
+
+        path = self.local_root / filename
+        return str(path) if path.is_file() else None
+
     def exists(self, filename: str) -> bool:
         res: bool = self.op.exists(path=filename)
         return res
 
     def delete(self, filename: str):
-        if self.exists(filename):
-            self.op.delete(path=filename)
-            logger.debug(f"file {filename} deleted")
-            return
-        logger.debug(f"file {filename} not found, skip delete")
+        # deleting a missing object is not an error in OpenDAL, no need to check first
+        self.op.delete(path=filename)
+        logger.debug(f"file {filename} deleted")
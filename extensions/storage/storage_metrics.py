@@ -0,0 +1,85 @@
+import logging
+import time
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    Counter = Histogram = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+if Histogram is not None:
+    STORAGE_OPERATION_LATENCY = Histogram(
+        "storage_operation_duration_seconds",
+        "Latency of storage operations, streams are measured until they are exhausted or closed",
+        ["operation", "storage_type"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    )
+    STORAGE_OPERATION_BYTES = Histogram(
+        "storage_operation_bytes",
+        "Number of bytes moved by storage operations",
+        ["operation", "storage_type"],
+        # 1KB to 1GB
+        buckets=tuple(2**i for i in range(10, 31, 2)),
+    )
+    STORAGE_OPERATION_ERRORS = Counter(
+        "storage_operation_errors",
+        "Number of failed storage operations, batch operations count every failed key",
+        ["operation", "storage_type", "error_type"],
+    )
+
+
+class StorageObservation:
+    size: Optional[int] = None
+
+
+class StorageMetrics:
+    """
+    Records latency, bytes and errors of storage operations, labeled by operation and storage type.
+    Does nothing when disabled or when prometheus_client is not installed.
+    """
+
+    def __init__(self, storage_type: str, enabled: bool):
+        self.storage_type = storage_type
+        self.enabled = enabled and Histogram is not None
+        if enabled and Histogram is None:
+            logger.warning("prometheus_client is not installed, storage metrics are disabled")
+
+    @contextmanager
+    def track(self, operation: str) -> Generator[StorageObservation, None, None]:
+        """Measure the enclosed block, set `size` on the yielded observation to record the bytes moved."""
+        observation = StorageObservation()
+        if not self.enabled:
+            yield observation
+            return
+
+        start_at = time.perf_counter()
+        try:
+            yield observation
+        except Exception as e:
+            self.count_errors(operation, type(e).__name__)
+            raise
+        finally:
+            # a stream closed early by its consumer still counts, with the bytes it delivered
+            STORAGE_OPERATION_LATENCY.labels(operation, self.storage_type).observe(time.perf_counter() - start_at)
+            if observation.size is not None:
+                STORAGE_OPERATION_BYTES.labels(operation, self.storage_type).observe(observation.size)
+
+    def track_stream(self, operation: str, stream: Iterator[bytes]) -> Iterator[bytes]:
+        if not self.enabled:
+            return stream
+        return self._track_stream(operation, stream)
+
+    def _track_stream(self, operation: str, stream: Iterator[bytes]) -> Generator[bytes, None, None]:
+        with self.track(operation) as observation:
+            observation.size = 0
+            for chunk in stream:
+                observation.size += len(chunk)
+                yield chunk
+
+    def count_errors(self, operation: str, error_type: str, count: int = 1):
+        if self.enabled and count:
+            STORAGE_OPERATION_ERRORS.labels(operation, self.storage_type, error_type).inc(count)
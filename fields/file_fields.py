@@ -11,6 +11,14 @@ file_fields = {
     "created_by": fields.String,
     "created_at": TimestampField,
 }
+
+file_pagination_fields = {
+    "limit": fields.Integer,
+    "has_more": fields.Boolean,
+    "next_cursor": fields.String,
+    "data": fields.List(fields.Nested(file_fields)),
+}
+
 upload_config_fields = {
     "file_size_limit": fields.Integer,
     "batch_count_limit": fields.Integer,
@@ -0,0 +1,62 @@
+import asyncio
+from collections.abc import Callable, Coroutine, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+def _is_gevent_patched() -> bool:
+    try:
+        from gevent import monkey  # type: ignore
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Under gevent the event loop runs on a native thread of the hub's threadpool, so only the calling greenlet
+    waits while the other greenlets of the worker keep running. Group many storage calls into one coroutine
+    (e.g. `async_storage.load_many`) to overlap their requests.
+    """
+    if _is_gevent_patched():
+        from gevent import get_hub  # type: ignore
+
+        return get_hub().threadpool.apply(asyncio.run, (coro,))
+
+    return asyncio.run(coro)
+
+
+def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a CPU-bound call that releases the GIL (e.g. image decoding) on a native thread.
+    Under gevent this keeps the worker's other greenlets running, otherwise the call runs inline.
+    """
+    if _is_gevent_patched():
+        from gevent import get_hub  # type: ignore
+
+        return get_hub().threadpool.apply(func, args)
+
+    return func(*args)
+
+
+def map_blocking(func: Callable[[Any], T], items: Iterable[Any], max_workers: int) -> list[T]:
+    """
+    Call `func` on every item on native threads with at most `max_workers` calls in flight, return the results
+    in order. Under gevent the calls go to the hub's threadpool, a monkey-patched ThreadPoolExecutor would run
+    them as greenlets, one after another, and native extensions such as OpenDAL crash there.
+    """
+    items = list(items)
+    if _is_gevent_patched():
+        from gevent import get_hub  # type: ignore
+        from gevent.pool import Pool  # type: ignore
+
+        threadpool = get_hub().threadpool
+        pool = Pool(min(max_workers, len(items)))
+        return list(pool.imap(lambda item: threadpool.apply(func, (item,)), items))
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
@@ -1,3 +1,4 @@
+import hashlib
 import time
 
 from flask_restful import fields  # type: ignore
@@ -10,6 +11,10 @@ class TimestampField(fields.Raw):
         return int(value.timestamp())
 
 
+def generate_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class RateLimiter:
     def __init__(self, prefix: str, max_attempts: int, time_window: int):
         self.prefix = prefix
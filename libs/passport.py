@@ -1,7 +1,27 @@
+import hashlib
+import logging
+import time
+from typing import Any
+
 import jwt
 from werkzeug.exceptions import Unauthorized
 
 from configs import rag_config
+from extensions.ext_redis import redis_client
+from libs.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOKEN_KEY_PREFIX = "passport:revoked:"
+REVOCATION_GENERATION_KEY = "passport:revocation_generation"
+# tokens without an `exp` claim are verified again after this many seconds
+MAX_CACHE_TTL = 300
+# how long a worker reuses the revocation generation before reading it from Redis again
+GENERATION_CHECK_INTERVAL = 5
+
+# token digest -> (decoded claims, revocation generation when they were checked)
+_verified_tokens: TTLCache[str, tuple[dict[str, Any], int]] = TTLCache(maxsize=4096, ttl=MAX_CACHE_TTL)
+_generation_cache: TTLCache[str, int] = TTLCache(maxsize=1, ttl=GENERATION_CHECK_INTERVAL)
 
 
 class PassportService:
@@ -12,11 +32,86 @@ class PassportService:
         return jwt.encode(payload, self.sk, algorithm="HS256")
 
     def verify(self, token):
+        """
+        Verify a token and return its claims.
+
+        Verified claims are cached per process until the token's `exp`, keyed by a digest of the token, so repeat
+        requests of a session skip the signature check. A cached token is checked against the deny-list again
+        whenever the revocation generation moved since it was verified.
+        """
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        generation = self._get_revocation_generation()
+
+        cached = _verified_tokens.get(digest)
+        if cached:
+            claims, checked_generation = cached
+            if checked_generation == generation:
+                return dict(claims)
+            if self._is_revoked(digest):
+                _verified_tokens.delete(digest)
+                raise Unauthorized("Token has been revoked.")
+            self._cache_claims(digest, claims, generation)
+            return dict(claims)
+
         try:
-            return jwt.decode(token, self.sk, algorithms=["HS256"])
+            claims = jwt.decode(token, self.sk, algorithms=["HS256"])
         except jwt.exceptions.InvalidSignatureError:
             raise Unauthorized("Invalid token signature.")
         except jwt.exceptions.DecodeError:
             raise Unauthorized("Invalid token.")
         except jwt.exceptions.ExpiredSignatureError:
             raise Unauthorized("Token has expired.")
+
+        if self._is_revoked(digest):
+            raise Unauthorized("Token has been revoked.")
+
+        self._cache_claims(digest, claims, generation)
+        return dict(claims)
+
+    @staticmethod
+    def revoke(token: str):
+        """Deny a token until it expires, in all workers."""
+        claims = jwt.decode(token, options={"verify_signature": False})
+        exp = claims.get("exp")
+        # a token without expiry stays denied
+        expires_in = max(int(exp - time.time()), 1) if isinstance(exp, int | float) else None
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(f"{REVOKED_TOKEN_KEY_PREFIX}{digest}", 1, ex=expires_in)
+        pipe.incr(REVOCATION_GENERATION_KEY)
+        pipe.execute()
+        _verified_tokens.delete(digest)
+        _generation_cache.clear()
+
+    @staticmethod
+    def _cache_claims(digest: str, claims: dict[str, Any], generation: int):
+        if generation < 0:
+            # revocations cannot be seen without Redis, do not trust this result later
+            return
+        exp = claims.get("exp")
+        ttl = exp - time.time() if isinstance(exp, int | float) else MAX_CACHE_TTL
+        _verified_tokens.set(digest, (claims, generation), ttl=ttl)
+
+    @staticmethod
+    def _get_revocation_generation() -> int:
+        generation = _generation_cache.get(REVOCATION_GENERATION_KEY)
+        if generation is not None:
+            return generation
+
+        try:
+            generation = int(redis_client.get(REVOCATION_GENERATION_KEY) or 0)
+        except Exception:
+            logger.exception("Failed to read token revocation generation")
+            # never matches a cached generation, so cached tokens are checked again
+            return -1
+        _generation_cache.set(REVOCATION_GENERATION_KEY, generation)
+        return generation
+
+    @staticmethod
+    def _is_revoked(digest: str) -> bool:
+        try:
+            return bool(redis_client.exists(f"{REVOKED_TOKEN_KEY_PREFIX}{digest}"))
+        except Exception:
+            logger.exception("Failed to read token deny-list")
+            return False
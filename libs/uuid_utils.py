@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+import uuid
+
+# the 12-bit rand_a field holds a counter, so ids made in the same millisecond still sort in creation order
+_COUNTER_MAX = 0xFFF
+
+_lock = threading.Lock()
+_last_timestamp_ms = 0
+_counter = 0
+
+
+def uuidv7() -> str:
+    """
+    Return a new RFC 9562 version 7 UUID as a string.
+
+    The leading 48 bits are the Unix time in milliseconds, so ids sort by creation time and consecutive inserts
+    land on the same B-tree pages. Ids from one process are strictly increasing, even if the clock steps back.
+    """
+    global _last_timestamp_ms, _counter
+
+    with _lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms > _last_timestamp_ms:
+            _last_timestamp_ms = timestamp_ms
+            # start low in the counter range so the millisecond has room for many more ids
+            _counter = int.from_bytes(os.urandom(2)) & 0x1FF
+        elif _counter < _COUNTER_MAX:
+            _counter += 1
+        else:
+            # counter exhausted, borrow the next millisecond
+            _last_timestamp_ms += 1
+            _counter = 0
+        timestamp_ms, counter = _last_timestamp_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+    return str(uuid.UUID(int=value))
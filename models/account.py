@@ -5,6 +5,7 @@ from flask_login import UserMixin  # type: ignore
 from sqlalchemy import func
 from sqlalchemy.orm import Mapped, mapped_column
 
+from libs.uuid_utils import uuidv7
 from models.base import Base
 
 from .engine import db
@@ -27,7 +28,7 @@ class Account(UserMixin, Base):
     )
 
     id: Mapped[str] = mapped_column(
-        StringUUID, server_default=db.text("uuid_generate_v4()")
+        StringUUID, default=uuidv7, server_default=db.text("uuid_generate_v4()")
     )
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), nullable=False)
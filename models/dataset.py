@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped
+
+from models.base import Base
+
+from .engine import db
+from .types import StringUUID
+
+
+class DocumentSegment(Base):
+    """
+    A chunk of an indexed document and the id of its vector in the vector store.
+    `index_node_hash` is the content hash of the chunk, it lets re-indexing skip chunks that did not change.
+    """
+
+    __tablename__ = "document_segments"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="document_segment_pkey"),
+        db.Index("document_segment_document_idx", "tenant_id", "collection_name", "document_id"),
+        db.Index("document_segment_node_idx", "index_node_id"),
+    )
+
+    id: Mapped[str] = db.Column(StringUUID, server_default=db.text("uuid_generate_v4()"))
+    tenant_id: Mapped[str] = db.Column(StringUUID, nullable=False)
+    collection_name: Mapped[str] = db.Column(db.String(255), nullable=False)
+    document_id: Mapped[str] = db.Column(db.String(255), nullable=False)
+    position: Mapped[int] = db.Column(db.Integer, nullable=False)
+    content: Mapped[str] = db.Column(db.Text, nullable=False)
+    word_count: Mapped[int] = db.Column(db.Integer, nullable=False)
+    index_node_id: Mapped[str] = db.Column(db.String(255), nullable=False)
+    index_node_hash: Mapped[str] = db.Column(db.String(255), nullable=False)
+    created_at: Mapped[datetime] = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+    updated_at: Mapped[datetime] = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
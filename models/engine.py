@@ -1,6 +1,18 @@
+import random
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import flask
+import sqlalchemy as sa
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy import MetaData
 
+from configs import rag_config
+from configs.middleware import REPLICA_BIND_KEY_PREFIX
+
 POSTGRES_INDEXES_NAMING_CONVENTION = {
     "ix": "%(column_0_label)s_idx",
     "uq": "%(table_name)s_%(column_0_name)s_key",
@@ -9,5 +21,106 @@ POSTGRES_INDEXES_NAMING_CONVENTION = {
     "pk": "%(table_name)s_pkey",
 }
 
+# session.info keys of the replica routing
+WROTE_KEY = "wrote_to_primary"
+PRIMARY_READS_KEY = "primary_reads"
+REPLICA_KEY = "replica_bind_key"
+CLIENT_STICKY_KEY = "client_sticks_to_primary"
+# cookie holding the time until which a client that committed writes reads from the primary
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+class RoutingSession(Session):
+    """
+    Session sending plain SELECTs to a read replica when replicas are configured, and everything else to the
+    primary. Once the session wrote anything it sticks to the primary until it is closed, so a request reads its
+    own writes, committed or not. A request that committed writes also sends its client a cookie keeping the
+    client's next requests on the primary for SQLALCHEMY_REPLICA_STICKY_SECONDS. A session reads from one
+    replica only.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is not None
+            or self.info.get(WROTE_KEY)
+            or self.info.get(PRIMARY_READS_KEY)
+            or self._client_sticks_to_primary()
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if not self._is_read_only(clause):
+            if clause is not None:
+                self.info[WROTE_KEY] = True
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        replica = self._get_replica()
+        if replica is None:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        return replica
+
+    def _is_read_only(self, clause: Any) -> bool:
+        # rows loaded while flushing belong to the write, textual SQL may be anything
+        if self._flushing or not isinstance(clause, sa.Select):
+            return False
+        return clause._for_update_arg is None
+
+    def _client_sticks_to_primary(self) -> bool:
+        sticks = self.info.get(CLIENT_STICKY_KEY)
+        if sticks is None:
+            sticks = False
+            if flask.has_request_context():
+                try:
+                    sticks = float(flask.request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time.time()
+                except ValueError:
+                    pass
+            self.info[CLIENT_STICKY_KEY] = sticks
+        return sticks
+
+    def _get_replica(self) -> Optional[sa.Engine]:
+        engines = self._db.engines
+        bind_key = self.info.get(REPLICA_KEY)
+        if bind_key is None:
+            replica_keys = [key for key in engines if key and key.startswith(REPLICA_BIND_KEY_PREFIX)]
+            if not replica_keys:
+                return None
+            bind_key = self.info[REPLICA_KEY] = random.choice(replica_keys)
+        return engines[bind_key]
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session: RoutingSession, flush_context):
+    session.info[WROTE_KEY] = True
+
+
+@sa.event.listens_for(RoutingSession, "after_commit")
+def _remember_commit(session: RoutingSession):
+    if session.info.get(WROTE_KEY) and flask.has_request_context():
+        flask.g.db_primary_until = time.time() + rag_config.SQLALCHEMY_REPLICA_STICKY_SECONDS
+
+
+def set_primary_until_cookie(response: flask.Response) -> flask.Response:
+    """after_request hook keeping a client that committed writes on the primary for its next requests."""
+    primary_until = flask.g.get("db_primary_until")
+    if primary_until and rag_config.SQLALCHEMY_REPLICA_STICKY_SECONDS:
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            f"{primary_until:.3f}",
+            max_age=rag_config.SQLALCHEMY_REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+@contextmanager
+def use_primary() -> Generator[None, None, None]:
+    """Read from the primary within the block, for reads that must not lag behind other sessions' writes."""
+    session = db.session()
+    session.info[PRIMARY_READS_KEY] = session.info.get(PRIMARY_READS_KEY, 0) + 1
+    try:
+        yield
+    finally:
+        session.info[PRIMARY_READS_KEY] -= 1
+
+
 metadata = MetaData(naming_convention=POSTGRES_INDEXES_NAMING_CONVENTION)
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={"class_": RoutingSession})
@@ -8,6 +8,7 @@ from sqlalchemy import func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from configs import rag_config
+from libs.uuid_utils import uuidv7
 from models.base import Base
 
 from .engine import db
@@ -22,7 +23,7 @@ class App(Base):
         db.Index("app_tenant_id_idx", "tenant_id"),
     )
 
-    id = db.Column(StringUUID, server_default=db.text("uuid_generate_v4()"))
+    id = db.Column(StringUUID, default=uuidv7, server_default=db.text("uuid_generate_v4()"))
     tenant_id: Mapped[str] = db.Column(StringUUID, nullable=False)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(
@@ -77,7 +78,7 @@ class EndUser(Base, UserMixin):
         db.Index("end_user_tenant_session_id_idx", "tenant_id", "session_id", "type"),
     )
 
-    id = db.Column(StringUUID, server_default=db.text("uuid_generate_v4()"))
+    id = db.Column(StringUUID, default=uuidv7, server_default=db.text("uuid_generate_v4()"))
     tenant_id = db.Column(StringUUID, nullable=False)
     app_id = db.Column(StringUUID, nullable=True)
     type = db.Column(db.String(255), nullable=False)
@@ -96,12 +97,21 @@ class EndUser(Base, UserMixin):
 class UploadFile(Base):
     __tablename__ = "upload_files"
     __table_args__ = (
+        # ids stay unique on their own, in the partitioned layout of UploadFilePartitionService
+        # the database key is (id, created_at)
         db.PrimaryKeyConstraint("id", name="upload_file_pkey"),
-        db.Index("upload_file_tenant_idx", "tenant_id"),
+        # tenant listings page through (created_at, id), the leading tenant_id also serves plain tenant lookups
+        db.Index("upload_file_tenant_created_at_idx", "tenant_id", "created_at", "id"),
+        db.Index(
+            "upload_file_unused_created_at_idx",
+            "created_at",
+            "id",
+            postgresql_where=db.text("used = false"),
+        ),
     )
 
     id: Mapped[str] = db.Column(
-        StringUUID, server_default=db.text("uuid_generate_v4()")
+        StringUUID, default=uuidv7, server_default=db.text("uuid_generate_v4()")
     )
     tenant_id: Mapped[str] = db.Column(StringUUID, nullable=False)
     storage_type: Mapped[str] = db.Column(db.String(255), nullable=False)
@@ -162,6 +172,22 @@ class UploadFile(Base):
         self.hash = hash
         self.source_url = source_url
 
+
+class UploadFileBlob(Base):
+    """
+    A storage object shared by all upload files with the same content, when content-addressed storage is enabled.
+    `ref_count` is the number of upload files whose key is this blob's key.
+    """
+
+    __tablename__ = "upload_file_blobs"
+    __table_args__ = (db.PrimaryKeyConstraint("key", name="upload_file_blob_pkey"),)
+
+    key: Mapped[str] = db.Column(db.String(255), nullable=False)
+    size: Mapped[int] = db.Column(db.Integer, nullable=False)
+    ref_count: Mapped[int] = db.Column(db.Integer, nullable=False, server_default=db.text("1"))
+    created_at: Mapped[datetime] = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class RagSetup(Base):
     __tablename__ = "dify_setups"
     __table_args__ = (db.PrimaryKeyConstraint("version", name="dify_setup_pkey"),)
@@ -1,3 +1,5 @@
+import uuid
+
 from sqlalchemy import CHAR, TypeDecorator
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -11,8 +13,10 @@ class StringUUID(TypeDecorator):
             return value
         elif dialect.name == "postgresql":
             return str(value)
-        else:
+        elif isinstance(value, uuid.UUID):
             return value.hex
+        else:
+            return uuid.UUID(value).hex
 
     def load_dialect_impl(self, dialect):
         if dialect.name == "postgresql":
@@ -0,0 +1,26 @@
+import time
+
+import click
+
+import app
+from configs import rag_config
+from core.rag.embedding.cached_embedding import EmbeddingCache
+
+
+@app.celery.task(queue="dataset")
+def clean_embedding_cache_task():
+    click.echo(click.style("Start clean embedding cache.", fg="green"))
+    start_at = time.perf_counter()
+
+    removed_count, removed_bytes = EmbeddingCache.evict(
+        max_age_seconds=rag_config.EMBEDDING_CACHE_MAX_AGE_DAYS * 24 * 60 * 60,
+        max_bytes=rag_config.EMBEDDING_CACHE_MAX_SIZE * 1024 * 1024,
+    )
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Cleaned {removed_count} embeddings ({removed_bytes} bytes) from cache, latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
@@ -0,0 +1,77 @@
+import datetime
+import time
+
+import click
+from sqlalchemy import delete, tuple_
+
+import app
+from configs import rag_config
+from extensions.ext_database import db
+from models.model import UploadFile
+from services.file_service import FileService
+from services.tenant_usage_service import TenantUsageService
+
+
+@app.celery.task(queue="dataset")
+def clean_unused_upload_files_task():
+    """
+    Remove uploads that were never used, with their storage objects.
+
+    Rows are walked in keyset pages ordered by (created_at, id) so every page is an index range scan. Each page is
+    removed with one DELETE statement and its storage objects are then deleted concurrently. A pause between
+    pages keeps locks short and the storage backend unsaturated.
+    """
+    click.echo(click.style("Start clean unused upload files.", fg="green"))
+    start_at = time.perf_counter()
+
+    expired_before = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) - datetime.timedelta(
+        days=rag_config.UNUSED_UPLOAD_FILE_RETENTION_DAYS
+    )
+    batch_size = rag_config.CLEAN_TASK_BATCH_SIZE
+    cursor: tuple[datetime.datetime, str] | None = None
+    deleted_count = 0
+
+    while True:
+        query = db.session.query(UploadFile.id, UploadFile.created_at).filter(
+            UploadFile.used == False,  # noqa: E712
+            UploadFile.created_at < expired_before,
+        )
+        if cursor:
+            query = query.filter(tuple_(UploadFile.created_at, UploadFile.id) > cursor)
+        rows = query.order_by(UploadFile.created_at, UploadFile.id).limit(batch_size).all()
+        if not rows:
+            db.session.commit()
+            break
+        cursor = (rows[-1].created_at, rows[-1].id)
+
+        # rows are deleted first and re-checked for `used`, so a file that got used in the meantime
+        # never loses its storage object
+        deleted_files = db.session.execute(
+            delete(UploadFile)
+            .where(
+                UploadFile.id.in_([row.id for row in rows]),
+                UploadFile.used == False,  # noqa: E712
+            )
+            .returning(UploadFile.key, UploadFile.tenant_id, UploadFile.size)
+        ).all()
+        db.session.commit()
+        deleted_keys = [deleted_file.key for deleted_file in deleted_files]
+        TenantUsageService.add_usages(
+            (deleted_file.tenant_id, -deleted_file.size, -1) for deleted_file in deleted_files
+        )
+
+        # the rows are already gone, objects that fail to delete are left behind as orphans
+        FileService.delete_file_contents(deleted_keys, max_workers=rag_config.CLEAN_TASK_STORAGE_CONCURRENCY)
+        deleted_count += len(deleted_keys)
+
+        if len(rows) < batch_size:
+            break
+        time.sleep(rag_config.CLEAN_TASK_BATCH_INTERVAL)
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Cleaned {deleted_count} unused upload files, latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
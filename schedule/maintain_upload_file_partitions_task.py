@@ -0,0 +1,43 @@
+import time
+
+import click
+
+import app
+from configs import rag_config
+from services.upload_file_partition_service import UploadFilePartitionService
+
+
+@app.celery.task(queue="dataset")
+def maintain_upload_file_partitions_task():
+    if not rag_config.UPLOAD_FILE_PARTITIONING_ENABLED:
+        return
+
+    if not UploadFilePartitionService.is_partitioned():
+        # converting locks the table, it is left to the convert-upload-files-to-partitions command
+        click.echo(
+            click.style(
+                "upload_files is not partitioned, run `flask convert-upload-files-to-partitions` first.",
+                fg="yellow",
+            )
+        )
+        return
+
+    click.echo(click.style("Start maintain upload file partitions.", fg="green"))
+    start_at = time.perf_counter()
+
+    created = UploadFilePartitionService.create_partitions(rag_config.UPLOAD_FILE_PARTITION_PREMAKE_MONTHS)
+    dropped = []
+    if rag_config.UPLOAD_FILE_PARTITION_RETENTION_MONTHS:
+        dropped = UploadFilePartitionService.drop_expired_partitions(
+            rag_config.UPLOAD_FILE_PARTITION_RETENTION_MONTHS,
+            batch_size=rag_config.CLEAN_TASK_BATCH_SIZE,
+            max_workers=rag_config.CLEAN_TASK_STORAGE_CONCURRENCY,
+        )
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Created partitions {created}, dropped partitions {dropped}, latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
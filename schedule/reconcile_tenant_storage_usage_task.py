@@ -0,0 +1,22 @@
+import time
+
+import click
+
+import app
+from services.tenant_usage_service import TenantUsageService
+
+
+@app.celery.task(queue="dataset")
+def reconcile_tenant_storage_usage_task():
+    click.echo(click.style("Start reconcile tenant storage usage.", fg="green"))
+    start_at = time.perf_counter()
+
+    tenant_count = TenantUsageService.reconcile()
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Reconciled storage usage of {tenant_count} tenants, latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
@@ -0,0 +1,22 @@
+import time
+
+import click
+
+import app
+from services.account_service import AccountService
+
+
+@app.celery.task(queue="dataset")
+def update_account_last_active_task():
+    click.echo(click.style("Start update account last active time.", fg="green"))
+    start_at = time.perf_counter()
+
+    updated_count = AccountService.flush_activity()
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Updated last active time of {updated_count} accounts, latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
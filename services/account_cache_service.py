@@ -0,0 +1,176 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Optional, TypeVar
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from configs import rag_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.ttl_cache import TTLCache
+from models.account import Account, Tenant, TenantAccountJoin
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M")
+
+ACCOUNT_KEY_PREFIX = "account_snapshot:"
+TENANT_KEY_PREFIX = "tenant_snapshot:"
+# credentials never leave the database, they are loaded on access if a request needs them
+EXCLUDED_ACCOUNT_COLUMNS = frozenset({"password", "password_salt"})
+# session.info key of the cache keys to drop once the session commits
+PENDING_INVALIDATIONS_KEY = "account_cache_invalidations"
+
+_local_cache: TTLCache[str, dict] = TTLCache(maxsize=1024, ttl=rag_config.ACCOUNT_CACHE_LOCAL_TTL)
+
+
+def _dump_columns(instance: Any, exclude: frozenset[str] = frozenset()) -> dict:
+    data = {}
+    for column in instance.__table__.columns:
+        if column.key in exclude:
+            continue
+        value = getattr(instance, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _delete_keys(keys: list[str]):
+    for key in keys:
+        _local_cache.delete(key)
+    try:
+        redis_client.delete(*keys)
+    except Exception:
+        logger.exception("Failed to invalidate account cache")
+
+
+def _load_columns(model: type[M], data: dict) -> M:
+    """Rebuild a persistent instance from cached columns without a query, missing columns load on access."""
+    instance = model()
+    for column in model.__table__.columns:  # type: ignore[attr-defined]
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(column.type, sa.DateTime):
+            value = datetime.fromisoformat(value)
+        setattr(instance, column.key, value)
+
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+
+class AccountCacheService:
+    """
+    Two-level cache of the account and current tenant resolved for a request.
+
+    Snapshots of their columns are kept in Redis and, for a few seconds, in process memory. Accounts and tenants
+    are cached under separate keys, so a tenant change does not touch its members' entries. Inserts, updates and
+    deletes of accounts, tenants and tenant memberships made through the ORM invalidate the Redis entries once
+    their transaction commits. Bulk statements bypass the ORM, call `invalidate` after them.
+    """
+
+    @staticmethod
+    def _get_snapshot(key: str) -> Optional[dict]:
+        snapshot = _local_cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        data = redis_client.get(key)
+        if data is None:
+            return None
+        snapshot = json.loads(data)
+        if rag_config.ACCOUNT_CACHE_LOCAL_TTL:
+            _local_cache.set(key, snapshot)
+        return snapshot
+
+    @staticmethod
+    def get_account(account_id: str) -> Optional[Account]:
+        """Return the cached account with its current tenant attached to the session, or None on a miss."""
+        if not rag_config.ACCOUNT_CACHE_ENABLED:
+            return None
+
+        try:
+            account_snapshot = AccountCacheService._get_snapshot(f"{ACCOUNT_KEY_PREFIX}{account_id}")
+            if account_snapshot is None:
+                return None
+            tenant_key = f"{TENANT_KEY_PREFIX}{account_snapshot['tenant_id']}"
+            tenant_snapshot = AccountCacheService._get_snapshot(tenant_key)
+            if tenant_snapshot is None:
+                return None
+        except Exception:
+            logger.exception(f"Failed to read account cache of {account_id}")
+            return None
+
+        account = _load_columns(Account, account_snapshot["account"])
+        tenant = _load_columns(Tenant, tenant_snapshot)
+        tenant.current_role = account_snapshot["role"]
+        account._current_tenant = tenant
+        return account
+
+    @staticmethod
+    def set_account(account: Account):
+        """Cache an account whose current tenant is resolved."""
+        if not rag_config.ACCOUNT_CACHE_ENABLED or not account.current_tenant:
+            return
+
+        tenant = account.current_tenant
+        account_snapshot = {
+            "account": _dump_columns(account, exclude=EXCLUDED_ACCOUNT_COLUMNS),
+            "tenant_id": tenant.id,
+            "role": tenant.current_role,
+        }
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            ttl = rag_config.ACCOUNT_CACHE_TTL
+            pipe.set(f"{ACCOUNT_KEY_PREFIX}{account.id}", json.dumps(account_snapshot, default=str), ex=ttl)
+            pipe.set(f"{TENANT_KEY_PREFIX}{tenant.id}", json.dumps(_dump_columns(tenant), default=str), ex=ttl)
+            pipe.execute()
+        except Exception:
+            logger.exception(f"Failed to write account cache of {account.id}")
+
+    @staticmethod
+    def invalidate(*, account_ids: Optional[list[str]] = None, tenant_ids: Optional[list[str]] = None):
+        keys = [f"{ACCOUNT_KEY_PREFIX}{account_id}" for account_id in account_ids or []]
+        keys.extend(f"{TENANT_KEY_PREFIX}{tenant_id}" for tenant_id in tenant_ids or [])
+        if keys:
+            _delete_keys(keys)
+
+
+def _add_pending_invalidation(target: Any, key: str):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_INVALIDATIONS_KEY, set()).add(key)
+
+
+def _on_account_changed(mapper, connection, target: Account):
+    _add_pending_invalidation(target, f"{ACCOUNT_KEY_PREFIX}{target.id}")
+
+
+def _on_tenant_changed(mapper, connection, target: Tenant):
+    _add_pending_invalidation(target, f"{TENANT_KEY_PREFIX}{target.id}")
+
+
+def _on_tenant_account_join_changed(mapper, connection, target: TenantAccountJoin):
+    # the current tenant and the role are part of the account's entry
+    _add_pending_invalidation(target, f"{ACCOUNT_KEY_PREFIX}{target.account_id}")
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Account, _event_name, _on_account_changed)
+    event.listen(Tenant, _event_name, _on_tenant_changed)
+    event.listen(TenantAccountJoin, _event_name, _on_tenant_account_join_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    # dropping the entries before the commit would let a concurrent request cache the old rows again
+    keys = session.info.pop(PENDING_INVALIDATIONS_KEY, None)
+    if keys:
+        _delete_keys(list(keys))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_invalidations(session: Session, previous_transaction):
+    session.info.pop(PENDING_INVALIDATIONS_KEY, None)
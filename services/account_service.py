@@ -1,13 +1,21 @@
+import logging
 from datetime import UTC, datetime, timedelta
 from typing import Any, Optional, cast
 
+import redis
+import sqlalchemy as sa
 from pydantic import BaseModel
+from sqlalchemy import update
 from werkzeug.exceptions import Unauthorized
 
 from configs import rag_config
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from libs.helper import RateLimiter
+from libs.ttl_cache import TTLCache
 from models.account import Account, AccountStatus, TenantAccountJoin
+from models.types import StringUUID
+from services.account_cache_service import AccountCacheService
 
 
 class TokenPair(BaseModel):
@@ -19,6 +27,16 @@ REFRESH_TOKEN_PREFIX = "refresh_token:"
 ACCOUNT_REFRESH_TOKEN_PREFIX = "account_refresh_token:"
 REFRESH_TOKEN_EXPIRY = timedelta(days=rag_config.REFRESH_TOKEN_EXPIRE_DAYS)
 
+ACCOUNT_ACTIVITY_KEY = "account_last_active_at"
+ACCOUNT_ACTIVITY_FLUSHING_KEY = "account_last_active_at:flushing"
+ACCOUNT_ACTIVITY_FLUSH_LOCK_KEY = "account_last_active_at:flush_lock"
+ACCOUNT_ACTIVITY_FLUSH_LOCK_TIMEOUT = 600
+ACTIVITY_UPDATE_INTERVAL = timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+_recorded_activity: TTLCache[str, bool] = TTLCache(maxsize=10000, ttl=ACTIVITY_UPDATE_INTERVAL.total_seconds())
+
 
 class AccountService:
     reset_password_rate_limiter = RateLimiter(
@@ -37,6 +55,23 @@ class AccountService:
 
     @staticmethod
     def load_user(user_id: str) -> None | Account:
+        account = AccountCacheService.get_account(user_id)
+        if not account:
+            account = AccountService._load_user_from_db(user_id)
+            if not account:
+                return None
+            AccountCacheService.set_account(account)
+
+        # a cached snapshot may predate a ban, e.g. one written by a bulk statement that did not invalidate it
+        if account.status == AccountStatus.BANNED.value:
+            raise Unauthorized("Account is banned.")
+
+        AccountService.record_activity(account)
+
+        return cast(Account, account)
+
+    @staticmethod
+    def _load_user_from_db(user_id: str) -> None | Account:
         account = db.session.query(Account).filter_by(id=user_id).first()
         if not account:
             return None
@@ -62,14 +97,78 @@ class AccountService:
             available_ta.current = True
             db.session.commit()
 
-        if datetime.now(UTC).replace(tzinfo=None) - account.last_active_at > timedelta(
-            minutes=10
-        ):
-            account.last_active_at = datetime.now(UTC).replace(tzinfo=None)
-            db.session.commit()
-
-        return cast(Account, account)
+        return account
 
     @staticmethod
     def load_logged_in_account(*, account_id: str):
         return AccountService.load_user(account_id)
+
+    @staticmethod
+    def record_activity(account: Account):
+        """
+        Record that an account is active without writing to the database, `flush_activity` moves the recorded
+        times to `last_active_at` in bulk. A time is recorded at most every ACTIVITY_UPDATE_INTERVAL per account.
+        """
+        now = datetime.now(UTC).replace(tzinfo=None)
+        if now - account.last_active_at <= ACTIVITY_UPDATE_INTERVAL:
+            return
+        # the loaded row keeps its old time until the next flush, only record once per worker meanwhile
+        if _recorded_activity.get(account.id):
+            return
+
+        try:
+            redis_client.hset(ACCOUNT_ACTIVITY_KEY, account.id, int(now.replace(tzinfo=UTC).timestamp()))
+        except Exception:
+            logger.exception(f"Failed to record activity of account {account.id}")
+            return
+        _recorded_activity.set(account.id, True)
+
+    @staticmethod
+    def flush_activity(batch_size: int = 1000) -> int:
+        """Write the activity times recorded in Redis to the accounts table, return the number of accounts."""
+        # runs never overlap, one could otherwise delete the hash another renamed for flushing meanwhile
+        lock = redis_client.lock(ACCOUNT_ACTIVITY_FLUSH_LOCK_KEY, timeout=ACCOUNT_ACTIVITY_FLUSH_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return 0
+        try:
+            return AccountService._flush_activity(batch_size)
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                logger.warning("Account activity flush outlived its lock")
+
+    @staticmethod
+    def _flush_activity(batch_size: int) -> int:
+        # the hash is renamed first so new activity goes to a fresh one. RENAMENX never replaces a hash left
+        # behind by a flush that failed midway, that hash is flushed first
+        try:
+            redis_client.renamenx(ACCOUNT_ACTIVITY_KEY, ACCOUNT_ACTIVITY_FLUSHING_KEY)
+        except redis.exceptions.ResponseError:
+            # no activity recorded
+            pass
+
+        activity = [
+            (account_id.decode(), datetime.fromtimestamp(int(timestamp), UTC).replace(tzinfo=None))
+            for account_id, timestamp in redis_client.hgetall(ACCOUNT_ACTIVITY_FLUSHING_KEY).items()
+        ]
+        for i in range(0, len(activity), batch_size):
+            batch = activity[i : i + batch_size]
+            activity_values = sa.values(
+                sa.column("id", sa.String), sa.column("last_active_at", sa.DateTime), name="activity"
+            ).data(batch)
+            db.session.execute(
+                update(Account)
+                .where(
+                    Account.id == sa.cast(activity_values.c.id, StringUUID),
+                    Account.last_active_at < activity_values.c.last_active_at,
+                )
+                .values(last_active_at=activity_values.c.last_active_at)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            # bulk updates bypass the ORM events that invalidate cached accounts
+            AccountCacheService.invalidate(account_ids=[account_id for account_id, _ in batch])
+
+        redis_client.delete(ACCOUNT_ACTIVITY_FLUSHING_KEY)
+        return len(activity)
@@ -11,3 +11,11 @@ class FileTooLargeError(BaseServiceError):
 
 class UnsupportedFileTypeError(BaseServiceError):
     pass
+
+
+class InvalidCursorError(BaseServiceError):
+    pass
+
+
+class StorageQuotaExceededError(BaseServiceError):
+    description = "{message}"
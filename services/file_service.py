@@ -1,26 +1,37 @@
+import base64
+import binascii
 import datetime
 import hashlib
 import uuid
+from collections import Counter
+from collections.abc import Generator, Iterable
 from pathlib import Path
-from typing import Any, Literal, Union
+from typing import Any, Literal, Optional, Union
 
+import sqlalchemy as sa
 from flask_login import current_user  # type: ignore
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from werkzeug.exceptions import NotFound
 
 from configs import rag_config
 from constants import (AUDIO_EXTENSIONS, DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS,
                        VIDEO_EXTENSIONS)
 from extensions.ext_storage import storage
+from extensions.storage import compression
 from models.account import Account
 # from core.file import helpers as file_helpers
 # from core.rag.extractor.extract_processor import ExtractProcessor
 from models.engine import db
 from models.enums import CreatedByRole
-from models.model import EndUser, UploadFile
+from models.model import EndUser, UploadFile, UploadFileBlob
 
-from .errors.file import FileTooLargeError, UnsupportedFileTypeError
+from .errors.file import FileTooLargeError, InvalidCursorError, UnsupportedFileTypeError
+from .image_variant_service import DEFAULT_VARIANT_FORMAT, VARIANT_FORMATS, ImageVariantService
+from .tenant_usage_service import TenantUsageService
 
 PREVIEW_WORDS_LIMIT = 3000
+BLOB_KEY_PREFIX = "blobs/"
 
 
 class FileService:
@@ -90,6 +101,8 @@ class FileService:
             # end_user
             current_tenant_id = user.tenant_id
 
+        TenantUsageService.check_quota(current_tenant_id or "", file_size)
+
         file_key = (
             "upload_files/"
             + (current_tenant_id or "")
@@ -100,7 +113,10 @@ class FileService:
         )
 
         # save file to storage
-        storage.save(file_key, content)
+        content_hash = hashlib.sha3_256(content).hexdigest()
+        file_key = FileService._save_content(
+            file_key=file_key, content=content, content_hash=content_hash, extension=extension, mime_type=mimetype
+        )
 
         # save file to db
         upload_file = UploadFile(
@@ -119,15 +135,105 @@ class FileService:
             created_by=user.id,
             created_at=datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
             used=False,
-            hash=hashlib.sha3_256(content).hexdigest(),
+            hash=content_hash,
             source_url=source_url,
         )
 
         db.session.add(upload_file)
         db.session.commit()
+        TenantUsageService.add_usage(upload_file.tenant_id, file_size)
 
         return upload_file
 
+    @staticmethod
+    def _save_content(
+        *, file_key: str, content: bytes, content_hash: str, extension: str, mime_type: Optional[str]
+    ) -> str:
+        """
+        Save the content of a new upload file and return the storage key to record on it.
+
+        With content-addressed storage the content is saved once under its hash, and every further upload of the
+        same content only takes a reference on the blob. The reference is part of the current transaction. The
+        blob key keeps the extension, extractors pick their parser by the suffix of the key.
+        """
+        if not rag_config.STORAGE_CONTENT_ADDRESSED_ENABLED:
+            return storage.save(file_key, content, mime_type=mime_type, compress=True)
+
+        blob_key = f"{BLOB_KEY_PREFIX}{content_hash[:2]}/{content_hash}.{extension}"
+        # the stored key carries the codec of compressed content, it is the key of the blob
+        blob_key, data = storage.encode(blob_key, content, mime_type)
+        # a concurrent upload of the same content waits on the row until this transaction ends,
+        # xmax is 0 only for a freshly inserted row
+        is_new_blob = db.session.execute(
+            pg_insert(UploadFileBlob)
+            .values(key=blob_key, size=len(content))
+            .on_conflict_do_update(
+                index_elements=[UploadFileBlob.key],
+                set_={"ref_count": UploadFileBlob.ref_count + 1},
+            )
+            .returning(sa.literal_column("xmax = 0"))
+        ).scalar_one()
+
+        if is_new_blob:
+            try:
+                storage.save(blob_key, data)
+            except Exception:
+                db.session.rollback()
+                raise
+        return blob_key
+
+    @staticmethod
+    def delete_file_contents(keys: Iterable[str], *, max_workers: Optional[int] = None):
+        """
+        Delete the storage objects of upload files whose rows are already deleted and committed, together with
+        their resized image variants. A blob only loses one reference per key, and is deleted with its last reference.
+        """
+        keys = list(keys)
+        file_keys = [key for key in keys if not FileService._is_blob_key(key)]
+        if file_keys:
+            storage.delete_many(file_keys, max_workers=max_workers)
+            FileService._delete_image_variants(
+                [key for key in file_keys if key.rsplit(".", 1)[-1] in IMAGE_EXTENSIONS], max_workers=max_workers
+            )
+
+        released = Counter(key for key in keys if FileService._is_blob_key(key))
+        if not released:
+            return
+
+        released_values = sa.values(
+            sa.column("key", sa.String), sa.column("count", sa.Integer), name="released"
+        ).data(sorted(released.items()))
+        db.session.execute(
+            update(UploadFileBlob)
+            .where(UploadFileBlob.key == released_values.c.key)
+            .values(ref_count=UploadFileBlob.ref_count - released_values.c.count)
+        )
+        orphaned_keys = db.session.scalars(
+            delete(UploadFileBlob)
+            .where(UploadFileBlob.key.in_(list(released)), UploadFileBlob.ref_count <= 0)
+            .returning(UploadFileBlob.key)
+        ).all()
+
+        # delete the objects while the deleted rows are still locked: an upload of the same content
+        # waits for the commit, then finds no blob and saves the content again
+        storage.delete_many(orphaned_keys, max_workers=max_workers)
+        db.session.commit()
+
+        # the type of a blob is not part of its key, any of them may have variants
+        FileService._delete_image_variants(orphaned_keys, max_workers=max_workers)
+
+    @staticmethod
+    def _is_blob_key(key: str) -> bool:
+        return compression.strip_codec(key).startswith(BLOB_KEY_PREFIX)
+
+    @staticmethod
+    def _delete_image_variants(source_keys: list[str], *, max_workers: Optional[int] = None):
+        variant_keys = [
+            variant_key for key in source_keys for variant_key in ImageVariantService.get_variant_keys(key)
+        ]
+        if variant_keys:
+            storage.delete_many(variant_keys, max_workers=max_workers)
+
     @staticmethod
     def is_file_size_within_limit(*, extension: str, file_size: int) -> bool:
         if extension in IMAGE_EXTENSIONS:
@@ -150,9 +256,14 @@ class FileService:
         file_key = (
             "upload_files/" + current_user.current_tenant_id + "/" + file_uuid + ".txt"
         )
+        content = text.encode("utf-8")
+        TenantUsageService.check_quota(current_user.current_tenant_id, len(content))
 
         # save file to storage
-        storage.save(file_key, text.encode("utf-8"))
+        content_hash = hashlib.sha3_256(content).hexdigest()
+        file_key = FileService._save_content(
+            file_key=file_key, content=content, content_hash=content_hash, extension="txt", mime_type="text/plain"
+        )
 
         # save file to db
         upload_file = UploadFile(
@@ -160,7 +271,7 @@ class FileService:
             storage_type=rag_config.STORAGE_TYPE,
             key=file_key,
             name=text_name,
-            size=len(text),
+            size=len(content),
             extension="txt",
             mime_type="text/plain",
             created_by=current_user.id,
@@ -169,10 +280,12 @@ class FileService:
             used=True,
             used_by=current_user.id,
             used_at=datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+            hash=content_hash,
         )
 
         db.session.add(upload_file)
         db.session.commit()
+        TenantUsageService.add_usage(upload_file.tenant_id, upload_file.size)
 
         return upload_file
 
@@ -194,28 +307,99 @@ class FileService:
     #     return text
 
     @staticmethod
-    def get_image_preview(file_id: str, timestamp: str, nonce: str, sign: str):
-        # result = file_helpers.verify_image_signature(
-        #     upload_file_id=file_id, timestamp=timestamp, nonce=nonce, sign=sign
-        # )
-        # if not result:
-        #     raise NotFound("File not found or signature is invalid")
-
-        upload_file = (
-            db.session.query(UploadFile).filter(UploadFile.id == file_id).first()
-        )
+    def get_upload_file(
+        file_id: str, *, tenant_id: Optional[str] = None, image_only: bool = False
+    ) -> UploadFile:
+        query = db.session.query(UploadFile).filter(UploadFile.id == file_id)
+        if tenant_id is not None:
+            query = query.filter(UploadFile.tenant_id == tenant_id)
+        upload_file = query.first()
 
         if not upload_file:
             raise NotFound("File not found or signature is invalid")
 
-        # extract text from file
-        extension = upload_file.extension
-        if extension.lower() not in IMAGE_EXTENSIONS:
+        if image_only and upload_file.extension.lower() not in IMAGE_EXTENSIONS:
             raise UnsupportedFileTypeError()
 
-        generator = storage.load(upload_file.key, stream=True)
+        return upload_file
 
-        return generator, upload_file.mime_type
+    @staticmethod
+    def get_upload_files(
+        tenant_id: str,
+        *,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        extension: Optional[str] = None,
+        used: Optional[bool] = None,
+    ) -> tuple[list[UploadFile], Optional[str]]:
+        """
+        Return a page of a tenant's upload files, newest first, and the cursor of the next page or None on the last.
+
+        Pages continue after the (created_at, id) of the previous page's last row instead of skipping an offset,
+        so every page is a range scan of upload_file_tenant_created_at_idx however deep it is.
+        """
+        query = db.session.query(UploadFile).filter(UploadFile.tenant_id == tenant_id)
+        if cursor:
+            query = query.filter(
+                sa.tuple_(UploadFile.created_at, UploadFile.id) < FileService._decode_cursor(cursor)
+            )
+        if extension:
+            query = query.filter(UploadFile.extension == extension.lower())
+        if used is not None:
+            query = query.filter(UploadFile.used == used)
+
+        upload_files = (
+            query.order_by(UploadFile.created_at.desc(), UploadFile.id.desc()).limit(limit + 1).all()
+        )
+        if len(upload_files) <= limit:
+            return upload_files, None
+
+        upload_files = upload_files[:limit]
+        return upload_files, FileService._encode_cursor(upload_files[-1])
+
+    @staticmethod
+    def _encode_cursor(upload_file: UploadFile) -> str:
+        position = f"{upload_file.created_at.isoformat()}|{upload_file.id}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime.datetime, str]:
+        try:
+            created_at, file_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.datetime.fromisoformat(created_at), str(uuid.UUID(file_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursorError()
+
+    @staticmethod
+    def load_upload_file_stream(
+        upload_file: UploadFile, byte_range: Optional[tuple[int, int]] = None
+    ) -> Generator:
+        """
+        Stream the content of an upload file, or only the bytes in [start, end) when `byte_range` is given.
+        """
+        if byte_range:
+            start, end = byte_range
+            return storage.load_range(upload_file.key, start, end)
+
+        return storage.load(upload_file.key, stream=True)
+
+    @staticmethod
+    def get_image_preview(
+        file_id: str,
+        timestamp: str,
+        nonce: str,
+        sign: str,
+        width: Optional[int] = None,
+        image_format: str = DEFAULT_VARIANT_FORMAT,
+    ):
+        # result = file_helpers.verify_image_signature(
+        #     upload_file_id=file_id, timestamp=timestamp, nonce=nonce, sign=sign
+        # )
+        # if not result:
+        #     raise NotFound("File not found or signature is invalid")
+
+        upload_file = FileService.get_upload_file(file_id, image_only=True)
+        return FileService._load_image_preview(upload_file, width, image_format)
 
     @staticmethod
     def get_file_generator_by_file_id(
@@ -225,31 +409,28 @@ class FileService:
         # if not result:
         #     raise NotFound("File not found or signature is invalid")
 
-        upload_file = (
-            db.session.query(UploadFile).filter(UploadFile.id == file_id).first()
-        )
-
-        if not upload_file:
-            raise NotFound("File not found or signature is invalid")
-
-        generator = storage.load(upload_file.key, stream=True)
+        upload_file = FileService.get_upload_file(file_id)
+        generator = FileService.load_upload_file_stream(upload_file)
 
         return generator, upload_file
 
     @staticmethod
-    def get_public_image_preview(file_id: str):
-        upload_file = (
-            db.session.query(UploadFile).filter(UploadFile.id == file_id).first()
-        )
-
-        if not upload_file:
-            raise NotFound("File not found or signature is invalid")
-
-        # extract text from file
-        extension = upload_file.extension
-        if extension.lower() not in IMAGE_EXTENSIONS:
-            raise UnsupportedFileTypeError()
-
-        generator = storage.load(upload_file.key)
+    def get_public_image_preview(
+        file_id: str, width: Optional[int] = None, image_format: str = DEFAULT_VARIANT_FORMAT
+    ):
+        upload_file = FileService.get_upload_file(file_id, image_only=True)
+        return FileService._load_image_preview(upload_file, width, image_format)
 
-        return generator, upload_file.mime_type
+    @staticmethod
+    def _load_image_preview(upload_file: UploadFile, width: Optional[int], image_format: str):
+        """
+        Return the content of an image preview and its mime type, the resized variant when a width is given and
+        the image can be resized, otherwise the original as a stream.
+        """
+        if width and ImageVariantService.is_resizable(upload_file):
+            variant = ImageVariantService.get_variant(upload_file, width, image_format)
+            if variant:
+                data, _ = variant
+                return data, VARIANT_FORMATS[image_format]
+
+        return FileService.load_upload_file_stream(upload_file), upload_file.mime_type
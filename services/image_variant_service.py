@@ -0,0 +1,87 @@
+import io
+import logging
+from typing import Optional
+
+from configs import rag_config
+from extensions.ext_storage import storage
+from libs.async_bridge import run_blocking
+from models.model import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# requested widths are rounded up to a bucket, so a handful of variants per image covers every client
+VARIANT_WIDTHS = (128, 256, 512, 1024)
+VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+DEFAULT_VARIANT_FORMAT = "webp"
+VARIANT_KEY_PREFIX = "image_variants/"
+# vector and animated images are served as they are
+UNRESIZABLE_EXTENSIONS = {"svg", "gif"}
+
+
+class ImageVariantService:
+    @staticmethod
+    def get_variant_width(width: int) -> int:
+        for bucket in VARIANT_WIDTHS:
+            if width <= bucket:
+                return bucket
+        return VARIANT_WIDTHS[-1]
+
+    @staticmethod
+    def get_variant_key(source_key: str, width: int, image_format: str) -> str:
+        return f"{VARIANT_KEY_PREFIX}{source_key}/{width}.{image_format}"
+
+    @staticmethod
+    def get_variant_keys(source_key: str) -> list[str]:
+        return [
+            ImageVariantService.get_variant_key(source_key, width, image_format)
+            for width in VARIANT_WIDTHS
+            for image_format in VARIANT_FORMATS
+        ]
+
+    @staticmethod
+    def is_resizable(upload_file: UploadFile) -> bool:
+        return rag_config.IMAGE_VARIANT_ENABLED and upload_file.extension.lower() not in UNRESIZABLE_EXTENSIONS
+
+    @staticmethod
+    def get_variant(upload_file: UploadFile, width: int, image_format: str) -> Optional[tuple[bytes, int]]:
+        """
+        Return a resized variant of an image upload and its bucketed width, generating and caching it in
+        storage on first use. Return None when the image cannot be resized and the original should be served.
+        """
+        width = ImageVariantService.get_variant_width(width)
+        variant_key = ImageVariantService.get_variant_key(upload_file.key, width, image_format)
+        # a cached variant costs a single read, a miss is the exception
+        try:
+            return storage.load_once(variant_key), width
+        except FileNotFoundError:
+            pass
+
+        try:
+            with storage.open_file(upload_file.key) as source:
+                # decoding and encoding release the GIL, keep them off the worker's event loop
+                data = run_blocking(ImageVariantService._resize, source, width, image_format)
+        except Exception:
+            logger.exception(f"Failed to resize image {upload_file.id}, serving the original")
+            return None
+
+        storage.save(variant_key, data, mime_type=VARIANT_FORMATS[image_format])
+        return data, width
+
+    @staticmethod
+    def _resize(source, width: int, image_format: str) -> bytes:
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as image:
+            # JPEG can decode at a reduced scale directly, far cheaper than decoding the full image
+            image.draft("RGB", (width, width * 8))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+
+            if image_format == "jpeg":
+                image = image.convert("RGB")
+            elif image.mode not in {"RGB", "RGBA"}:
+                image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+            output = io.BytesIO()
+            image.save(output, format=image_format.upper(), quality=rag_config.IMAGE_VARIANT_QUALITY)
+            return output.getvalue()
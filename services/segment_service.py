@@ -0,0 +1,122 @@
+import datetime
+import logging
+import uuid
+from collections import defaultdict
+
+from pydantic import BaseModel
+
+from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.embedding.embedding_base import Embeddings
+from core.rag.models.document import Document
+from libs.helper import generate_text_hash
+from models.dataset import DocumentSegment
+from models.engine import db
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentSyncResult(BaseModel):
+    added: int
+    unchanged: int
+    removed: int
+
+
+class SegmentService:
+    @staticmethod
+    def sync_document_segments(
+        *,
+        tenant_id: str,
+        document_id: str,
+        documents: list[Document],
+        embeddings: Embeddings,
+        vector: BaseVector,
+    ) -> SegmentSyncResult:
+        """
+        Bring the vector index of a document in line with its freshly chunked content.
+
+        Chunks are matched to the stored segments by content hash: unchanged chunks keep their vector,
+        only added chunks are embedded and upserted, and segments that no longer appear are deleted.
+        """
+        existing_segments = (
+            db.session.query(DocumentSegment)
+            .filter(
+                DocumentSegment.tenant_id == tenant_id,
+                DocumentSegment.collection_name == vector.collection_name,
+                DocumentSegment.document_id == document_id,
+            )
+            .all()
+        )
+        # a document may contain the same chunk more than once, so keep every segment per hash
+        segments_by_hash: dict[str, list[DocumentSegment]] = defaultdict(list)
+        for segment in existing_segments:
+            segments_by_hash[segment.index_node_hash].append(segment)
+
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+        unchanged = 0
+        new_documents: list[Document] = []
+        new_segments: list[DocumentSegment] = []
+        for position, document in enumerate(documents, start=1):
+            text_hash = generate_text_hash(document.page_content)
+            matched_segments = segments_by_hash.get(text_hash)
+            if matched_segments:
+                segment = matched_segments.pop()
+                if segment.position != position:
+                    segment.position = position
+                    segment.updated_at = now
+                unchanged += 1
+                continue
+
+            doc_id = str(uuid.uuid4())
+            new_documents.append(
+                Document(
+                    page_content=document.page_content,
+                    metadata={
+                        **document.metadata,
+                        "doc_id": doc_id,
+                        "doc_hash": text_hash,
+                        "document_id": document_id,
+                    },
+                )
+            )
+            new_segments.append(
+                DocumentSegment(
+                    tenant_id=tenant_id,
+                    collection_name=vector.collection_name,
+                    document_id=document_id,
+                    position=position,
+                    content=document.page_content,
+                    word_count=len(document.page_content),
+                    index_node_id=doc_id,
+                    index_node_hash=text_hash,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+
+        removed_segments = [segment for segments in segments_by_hash.values() for segment in segments]
+
+        try:
+            if new_documents:
+                vectors = embeddings.embed_documents([document.page_content for document in new_documents])
+                vector.add_texts(new_documents, vectors)
+                db.session.add_all(new_segments)
+
+            if removed_segments:
+                db.session.query(DocumentSegment).filter(
+                    DocumentSegment.id.in_([segment.id for segment in removed_segments])
+                ).delete(synchronize_session=False)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # vectors are removed only after the segments are gone, a failure here leaves orphan vectors
+        # behind instead of segments that point at missing vectors
+        if removed_segments:
+            try:
+                vector.delete_by_ids([segment.index_node_id for segment in removed_segments])
+            except Exception:
+                logger.exception(f"Failed to delete stale vectors of document {document_id}")
+
+        return SegmentSyncResult(added=len(new_segments), unchanged=unchanged, removed=len(removed_segments))
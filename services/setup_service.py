@@ -0,0 +1,50 @@
+import logging
+import time
+
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import RagSetup
+
+logger = logging.getLogger(__name__)
+
+SETUP_FINISHED_KEY = "setup_finished"
+# how long a worker trusts its own positive result before asking Redis again, bounds how long
+# `invalidate_setup_status` takes to reach other workers
+LOCAL_CHECK_INTERVAL = 60
+
+
+class SetupService:
+    _setup_finished_at: float = 0
+
+    @staticmethod
+    def is_setup_finished() -> bool:
+        """
+        Whether the deployment is set up. Setup finishes once in a deployment's life, so a positive result is kept
+        in process and in Redis, and the database is only queried until setup is done.
+        """
+        if time.monotonic() - SetupService._setup_finished_at < LOCAL_CHECK_INTERVAL:
+            return True
+
+        try:
+            setup_finished = bool(redis_client.exists(SETUP_FINISHED_KEY))
+        except Exception:
+            logger.exception("Failed to read setup status from Redis")
+            setup_finished = False
+
+        if not setup_finished:
+            setup_finished = db.session.query(RagSetup).first() is not None
+            if setup_finished:
+                try:
+                    redis_client.set(SETUP_FINISHED_KEY, 1)
+                except Exception:
+                    logger.exception("Failed to write setup status to Redis")
+
+        if setup_finished:
+            SetupService._setup_finished_at = time.monotonic()
+        return setup_finished
+
+    @staticmethod
+    def invalidate_setup_status():
+        """Call after the setup record is removed, e.g. when a deployment is reset."""
+        SetupService._setup_finished_at = 0
+        redis_client.delete(SETUP_FINISHED_KEY)
@@ -0,0 +1,127 @@
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+
+import sqlalchemy as sa
+
+from configs import rag_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import UploadFile
+
+from .errors.file import StorageQuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+TENANT_USAGE_KEY_PREFIX = "tenant_storage_usage:"
+
+# counters only move while they exist, a missing counter is loaded from the database as a whole on next read
+INCREMENT_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    redis.call("hincrby", KEYS[1], "bytes", ARGV[1])
+    redis.call("hincrby", KEYS[1], "files", ARGV[2])
+end
+"""
+
+
+class TenantUsageService:
+    """
+    Storage used by each tenant's upload files, kept as byte and file counters in Redis.
+
+    Uploads and deletes move the counters, so reading them is O(1) where the database needs a SUM over the
+    tenant's rows. The reconcile task overwrites them with the database totals periodically, which corrects
+    changes made outside FileService and counters that missed an update.
+    """
+
+    @staticmethod
+    def get_usage(tenant_id: str) -> tuple[int, int]:
+        """Return the bytes and number of files stored by a tenant."""
+        key = f"{TENANT_USAGE_KEY_PREFIX}{tenant_id}"
+        usage = redis_client.hmget(key, "bytes", "files")
+        if usage[0] is not None and usage[1] is not None:
+            return int(usage[0]), int(usage[1])
+
+        storage_bytes, file_count = db.session.execute(
+            sa.select(sa.func.coalesce(sa.func.sum(UploadFile.size), 0), sa.func.count()).where(
+                UploadFile.tenant_id == tenant_id
+            )
+        ).one()
+        # a concurrent load may have won, keep its values
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hsetnx(key, "bytes", storage_bytes)
+        pipe.hsetnx(key, "files", file_count)
+        pipe.execute()
+        return int(storage_bytes), int(file_count)
+
+    @staticmethod
+    def check_quota(tenant_id: str, size: int):
+        """Raise StorageQuotaExceededError if storing `size` more bytes would exceed the tenant's quota."""
+        quota_mb = rag_config.TENANT_STORAGE_QUOTA_MB
+        if not quota_mb:
+            return
+
+        try:
+            storage_bytes, _ = TenantUsageService.get_usage(tenant_id)
+        except Exception:
+            # the quota is a soft limit, do not fail uploads while Redis is unavailable
+            logger.exception(f"Failed to read storage usage of tenant {tenant_id}")
+            return
+
+        if storage_bytes + size > quota_mb * 1024 * 1024:
+            raise StorageQuotaExceededError(f"Storage quota of {quota_mb} MB exceeded.")
+
+    @staticmethod
+    def add_usage(tenant_id: str, size: int, file_count: int = 1):
+        TenantUsageService.add_usages([(tenant_id, size, file_count)])
+
+    @staticmethod
+    def add_usages(usages: Iterable[tuple[str, int, int]]):
+        """Move the counters of several tenants by (tenant_id, bytes, files), negative to release storage."""
+        totals: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+        for tenant_id, size, file_count in usages:
+            totals[tenant_id][0] += size
+            totals[tenant_id][1] += file_count
+        if not totals:
+            return
+
+        try:
+            increment = redis_client.register_script(INCREMENT_SCRIPT)
+            pipe = redis_client.pipeline(transaction=False)
+            for tenant_id, (size, file_count) in totals.items():
+                increment(keys=[f"{TENANT_USAGE_KEY_PREFIX}{tenant_id}"], args=[size, file_count], client=pipe)
+            pipe.execute()
+        except Exception:
+            # the reconcile task corrects the counters
+            logger.exception("Failed to update tenant storage usage")
+
+    @staticmethod
+    def reconcile(batch_size: int = 1000) -> int:
+        """Overwrite the counters with the totals in the database, return the number of tenants."""
+        totals = db.session.execute(
+            sa.select(UploadFile.tenant_id, sa.func.sum(UploadFile.size), sa.func.count()).group_by(
+                UploadFile.tenant_id
+            )
+        ).all()
+        db.session.commit()
+
+        # uploads committed after the totals were read and counted before they are written are lost until the
+        # next run, like any drift
+        tenant_keys = set()
+        for i in range(0, len(totals), batch_size):
+            pipe = redis_client.pipeline(transaction=False)
+            for tenant_id, storage_bytes, file_count in totals[i : i + batch_size]:
+                key = f"{TENANT_USAGE_KEY_PREFIX}{tenant_id}"
+                tenant_keys.add(key)
+                pipe.hset(key, mapping={"bytes": int(storage_bytes), "files": file_count})
+            pipe.execute()
+
+        # tenants whose last file was deleted have no row left to sum
+        stale_keys = [
+            key
+            for key in redis_client.scan_iter(match=f"{TENANT_USAGE_KEY_PREFIX}*", count=batch_size)
+            if key.decode() not in tenant_keys
+        ]
+        if stale_keys:
+            redis_client.delete(*stale_keys)
+
+        return len(totals)
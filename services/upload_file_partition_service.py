@@ -0,0 +1,229 @@
+import datetime
+import logging
+import re
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from extensions.ext_database import db
+from models.model import UploadFile
+
+from .file_service import FileService
+from .tenant_usage_service import TenantUsageService
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = UploadFile.__tablename__
+UNPARTITIONED_TABLE_NAME = f"{TABLE_NAME}_unpartitioned"
+PARTITION_NAME_PATTERN = re.compile(rf"^{TABLE_NAME}_p(\d{{4}})(\d{{2}})$")
+# detaching waits for running queries on upload_files, give up instead of queueing every new query behind it
+DETACH_LOCK_TIMEOUT = "5s"
+
+
+def _month_start(value: datetime.date) -> datetime.date:
+    return value.replace(day=1)
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: datetime.date) -> str:
+    return f"{TABLE_NAME}_p{month:%Y%m}"
+
+
+class UploadFilePartitionService:
+    """
+    Optional layout of upload_files as a PostgreSQL table partitioned by month of created_at.
+
+    Queries restricted by created_at, such as the unused upload cleanup, only scan the matching partitions, and
+    months past the retention are detached from the table as a whole instead of deleted row by row. The files of
+    a detached partition are then released like any deleted upload file before the partition is dropped.
+
+    There is no default partition, a month must have its partition before its first upload. The maintenance task
+    creates them ahead of time.
+    """
+
+    @staticmethod
+    def is_partitioned() -> bool:
+        return bool(
+            db.session.execute(
+                sa.text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table_name))"
+                ),
+                {"table_name": TABLE_NAME},
+            ).scalar()
+        )
+
+    @staticmethod
+    def convert_table(premake_months: int):
+        """
+        Migrate an unpartitioned upload_files table to the partitioned layout in one transaction.
+
+        The rows are copied while the table is locked against reads and writes, so this only runs from the
+        `convert-upload-files-to-partitions` command in a maintenance window. PostgreSQL requires the partition
+        key in the primary key, so it becomes (id, created_at).
+        """
+        if UploadFilePartitionService.is_partitioned():
+            return
+
+        statements = [
+            f"ALTER TABLE {TABLE_NAME} RENAME TO {UNPARTITIONED_TABLE_NAME}",
+            f"ALTER TABLE {UNPARTITIONED_TABLE_NAME} "
+            "RENAME CONSTRAINT upload_file_pkey TO upload_file_unpartitioned_pkey",
+        ]
+        # the index names are reused by the partitioned table
+        statements.extend(f"DROP INDEX IF EXISTS {index.name}" for index in UploadFile.__table__.indexes)
+        statements.extend(
+            [
+                f"CREATE TABLE {TABLE_NAME} (LIKE {UNPARTITIONED_TABLE_NAME} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                " PARTITION BY RANGE (created_at)",
+                f"ALTER TABLE {TABLE_NAME} ADD CONSTRAINT upload_file_pkey PRIMARY KEY (id, created_at)",
+            ]
+        )
+        statements.extend(
+            str(CreateIndex(index).compile(dialect=postgresql.dialect())) for index in UploadFile.__table__.indexes
+        )
+        for statement in statements:
+            db.session.execute(sa.text(statement))
+
+        first_created_at, last_created_at = db.session.execute(
+            sa.text(f"SELECT min(created_at), max(created_at) FROM {UNPARTITIONED_TABLE_NAME}")
+        ).one()
+        current_month = _month_start(datetime.date.today())
+        first_month = _month_start(first_created_at.date()) if first_created_at else current_month
+        # without a default partition, inserts fail once the month has no partition, always cover the next one
+        last_month = _add_months(current_month, max(premake_months, 1))
+        if last_created_at:
+            last_month = max(last_month, _month_start(last_created_at.date()))
+        UploadFilePartitionService._create_partitions(first_month, last_month)
+
+        db.session.execute(sa.text(f"INSERT INTO {TABLE_NAME} SELECT * FROM {UNPARTITIONED_TABLE_NAME}"))
+        db.session.execute(sa.text(f"DROP TABLE {UNPARTITIONED_TABLE_NAME}"))
+        db.session.commit()
+
+    @staticmethod
+    def create_partitions(premake_months: int) -> list[str]:
+        """
+        Create the partitions of the current month and of the next `premake_months`, at least the next one,
+        return the new ones.
+        """
+        current_month = _month_start(datetime.date.today())
+        next_month = _add_months(current_month, 1)
+        existing = UploadFilePartitionService._get_partition_months()
+        for month in (current_month, next_month):
+            if month not in existing:
+                # earlier runs were missed or failed, uploads fail in that month until its partition exists
+                logger.error(f"{TABLE_NAME} has no partition for {month:%Y-%m}, creating it")
+
+        created = UploadFilePartitionService._create_partitions(
+            current_month, _add_months(current_month, max(premake_months, 1))
+        )
+        db.session.commit()
+        return created
+
+    @staticmethod
+    def _create_partitions(first_month: datetime.date, last_month: datetime.date) -> list[str]:
+        existing = set(UploadFilePartitionService._get_partition_months())
+
+        created = []
+        month = first_month
+        while month <= last_month:
+            if month not in existing:
+                db.session.execute(
+                    sa.text(
+                        f"CREATE TABLE {_partition_name(month)} PARTITION OF {TABLE_NAME} "
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                    )
+                )
+                created.append(_partition_name(month))
+            month = _add_months(month, 1)
+        return created
+
+    @staticmethod
+    def drop_expired_partitions(
+        retention_months: int, *, batch_size: int = 500, max_workers: Optional[int] = None
+    ) -> list[str]:
+        """
+        Detach the partitions of months older than `retention_months` before the current one, release their
+        files and drop them, return the dropped partitions. A partition left detached by an interrupted run is
+        finished first.
+        """
+        oldest_kept_month = _add_months(_month_start(datetime.date.today()), -retention_months)
+
+        for month in sorted(UploadFilePartitionService._get_partition_months()):
+            if month >= oldest_kept_month:
+                break
+            # one transaction per partition keeps the lock on upload_files short
+            db.session.execute(sa.text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+            db.session.execute(sa.text(f"ALTER TABLE {TABLE_NAME} DETACH PARTITION {_partition_name(month)}"))
+            db.session.commit()
+            logger.info(f"Detached partition {_partition_name(month)} of {TABLE_NAME}")
+
+        dropped = []
+        for month in sorted(UploadFilePartitionService._get_detached_months()):
+            partition_name = _partition_name(month)
+            UploadFilePartitionService._release_files(partition_name, batch_size, max_workers)
+            db.session.execute(sa.text(f"DROP TABLE {partition_name}"))
+            db.session.commit()
+            dropped.append(partition_name)
+            logger.info(f"Dropped partition {partition_name} of {TABLE_NAME}")
+        return dropped
+
+    @staticmethod
+    def _release_files(partition_name: str, batch_size: int, max_workers: Optional[int]):
+        # rows are deleted before their files, so a run that stops midway never releases a blob reference twice
+        while True:
+            deleted_files = db.session.execute(
+                sa.text(
+                    f"DELETE FROM {partition_name} WHERE id IN (SELECT id FROM {partition_name} LIMIT :batch_size)"
+                    " RETURNING key, tenant_id, size"
+                ),
+                {"batch_size": batch_size},
+            ).all()
+            db.session.commit()
+            if not deleted_files:
+                return
+
+            FileService.delete_file_contents(
+                [deleted_file.key for deleted_file in deleted_files], max_workers=max_workers
+            )
+            TenantUsageService.add_usages(
+                (str(deleted_file.tenant_id), -deleted_file.size, -1) for deleted_file in deleted_files
+            )
+
+    @staticmethod
+    def _get_partition_months() -> list[datetime.date]:
+        partition_names = db.session.scalars(
+            sa.text(
+                "SELECT child.relname FROM pg_inherits"
+                " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+                " WHERE pg_inherits.inhparent = to_regclass(:table_name)"
+            ),
+            {"table_name": TABLE_NAME},
+        ).all()
+        return UploadFilePartitionService._parse_partition_months(partition_names)
+
+    @staticmethod
+    def _get_detached_months() -> list[datetime.date]:
+        table_names = db.session.scalars(
+            sa.text(
+                "SELECT relname FROM pg_class"
+                " WHERE relkind = 'r' AND NOT relispartition AND relname LIKE :pattern"
+                " AND relnamespace = to_regnamespace(current_schema())"
+            ),
+            {"pattern": f"{TABLE_NAME}_p%"},
+        ).all()
+        return UploadFilePartitionService._parse_partition_months(table_names)
+
+    @staticmethod
+    def _parse_partition_months(partition_names: list[str]) -> list[datetime.date]:
+        months = []
+        for partition_name in partition_names:
+            match = PARTITION_NAME_PATTERN.match(partition_name)
+            if match:
+                months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+        return months
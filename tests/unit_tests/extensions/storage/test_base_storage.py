@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parents[4]
+
+
+def test_load_many_under_gevent_monkey_patch(tmp_path):
+    pytest.importorskip("gevent")
+    pytest.importorskip("opendal")
+    (tmp_path / "exists.txt").write_bytes(b"content")
+
+    # the monkey patch cannot be undone, run it in its own interpreter
+    script = textwrap.dedent(
+        f"""
+        from gevent import monkey
+        monkey.patch_all()
+
+        from extensions.storage.opendal_storage import OpenDALStorage
+
+        storage = OpenDALStorage("fs", root={str(tmp_path)!r})
+        for max_workers in (1, 8):
+            result = storage.load_many(["exists.txt", "missing.txt"], max_workers)
+            assert result["exists.txt"] == b"content", result
+            assert isinstance(result["missing.txt"], FileNotFoundError), result
+        """
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "BASE_DIR": str(tmp_path), "PYTHONPATH": str(PROJECT_ROOT)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert process.returncode == 0, process.stderr